@@ -0,0 +1,243 @@
+"""Nearest-neighbour search engines over the recommendation matrix.
+
+All engines score by inner product on L2-normalised rows (cosine similarity)
+and share one interface::
+
+    engine = build_engine('hnsw', matrix)
+    rows, scores = engine.search(queries, k)
+
+``exact`` and ``lsh`` only need NumPy; ``ivf`` and ``hnsw`` need faiss.
+Engines are built and saved next to the index artifacts by the commands
+writing an index (``save_engine()``) and memory-mapped back by every worker
+(``load_engine()``); requests never build one.
+"""
+import logging
+from pathlib import Path
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import faiss
+except ImportError:  # faiss is optional; the LSH engine covers hosts without it
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExactEngine:
+    """Brute-force scan, the reference the approximate engines are measured against."""
+    name = 'exact'
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, matrix, **options):
+        return cls(matrix)
+
+    def search(self, queries, k):
+        from apis.recommender import blocked_top_k
+
+        return blocked_top_k(queries, self.matrix, k)
+
+    def save(self, path):
+        pass
+
+    @classmethod
+    def load(cls, path, matrix, **options):
+        return cls(matrix)
+
+
+class FaissEngine:
+    """Shared plumbing for faiss-backed engines."""
+    name = None
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def build(cls, matrix, **options):
+        if faiss is None:
+            raise ImproperlyConfigured(f"The '{cls.name}' recommendation engine requires faiss.")
+        engine = cls(cls._create(matrix.shape[1], **options))
+        data = np.ascontiguousarray(matrix, dtype=np.float32)
+        if not engine.index.is_trained:
+            engine.index.train(data)
+        engine.index.add(data)
+        engine.configure(**options)
+        return engine
+
+    def configure(self, **options):
+        pass
+
+    def search(self, queries, k):
+        scores, rows = self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        return rows, scores
+
+    def save(self, path):
+        faiss.write_index(self.index, str(Path(path) / f'{self.name}.faiss'))
+
+    @classmethod
+    def load(cls, path, matrix, **options):
+        if faiss is None:
+            raise ImproperlyConfigured(f"The '{cls.name}' recommendation engine requires faiss.")
+        file = Path(path) / f'{cls.name}.faiss'
+        if not file.exists():
+            return None
+        engine = cls(faiss.read_index(str(file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
+        engine.configure(**options)
+        return engine
+
+
+class IVFEngine(FaissEngine):
+    """Inverted file: k-means cells, only ``nprobe`` cells scanned per query."""
+    name = 'ivf'
+
+    @staticmethod
+    def _create(dims, nlist=1024, **options):
+        quantizer = faiss.IndexFlatIP(dims)
+        return faiss.IndexIVFFlat(quantizer, dims, nlist, faiss.METRIC_INNER_PRODUCT)
+
+    @classmethod
+    def build(cls, matrix, nlist=1024, **options):
+        # faiss needs at least ~39 training points per cell
+        nlist = max(1, min(nlist, len(matrix) // 39))
+        return super().build(matrix, nlist=nlist, **options)
+
+    def configure(self, nprobe=16, **options):
+        self.index.nprobe = nprobe
+
+
+class HNSWEngine(FaissEngine):
+    """Hierarchical navigable small-world graph."""
+    name = 'hnsw'
+
+    @staticmethod
+    def _create(dims, m=32, ef_construction=200, **options):
+        index = faiss.IndexHNSWFlat(dims, m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    def configure(self, ef_search=64, **options):
+        self.index.hnsw.efSearch = ef_search
+
+
+class LSHEngine:
+    """Random-hyperplane LSH in pure NumPy.
+
+    Each of ``tables`` tables hashes a row to a ``bits``-bit signature. The
+    signatures are kept sorted so a bucket is a ``searchsorted`` range, which
+    lets the tables be memory-mapped like the matrix. Candidates from all
+    tables (and, with ``probes``, from buckets one bit away) are re-ranked
+    exactly.
+    """
+    name = 'lsh'
+
+    def __init__(self, matrix, planes, codes, order, probes=1):
+        self.matrix = matrix
+        self.planes = planes
+        self.codes = codes
+        self.order = order
+        self.probes = probes
+
+    @classmethod
+    def build(cls, matrix, tables=8, bits=16, probes=1, seed=0, block_size=65536, **options):
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((tables, bits, matrix.shape[1])).astype(np.float32)
+        codes = np.empty((tables, len(matrix)), dtype=np.uint64)
+        for start in range(0, len(matrix), block_size):
+            block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+            codes[:, start:start + len(block)] = cls._hash(planes, block)
+        order = np.argsort(codes, axis=1, kind='stable')
+        codes = np.take_along_axis(codes, order, axis=1)
+        return cls(matrix, planes, codes, order, probes=probes)
+
+    @staticmethod
+    def _hash(planes, vectors):
+        """``(tables, len(vectors))`` signatures of ``vectors``."""
+        bits = (np.einsum('tbd,nd->tnb', planes, vectors) > 0).astype(np.uint64)
+        weights = np.left_shift(np.uint64(1), np.arange(planes.shape[1], dtype=np.uint64))
+        return (bits * weights).sum(axis=2, dtype=np.uint64)
+
+    def _candidates(self, signatures):
+        bits = self.planes.shape[1]
+        flips = [np.uint64(0)] + [np.uint64(1) << np.uint64(bit) for bit in range(bits)][:self.probes - 1]
+        found = []
+        for table, signature in enumerate(signatures):
+            for flip in flips:
+                code = signature ^ flip
+                lo, hi = np.searchsorted(self.codes[table], [code, code + np.uint64(1)])
+                found.append(self.order[table, lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def search(self, queries, k):
+        from apis.recommender import top_k
+
+        queries = np.asarray(queries, dtype=np.float32)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for position, signatures in enumerate(self._hash(self.planes, queries).T):
+            candidates = self._candidates(signatures)
+            if not len(candidates):
+                continue
+            candidate_scores = np.asarray(self.matrix[candidates], dtype=np.float32) @ queries[position]
+            best = top_k(candidate_scores, k)
+            rows[position, :len(best)] = candidates[best]
+            scores[position, :len(best)] = candidate_scores[best]
+        return rows, scores
+
+    def save(self, path):
+        path = Path(path)
+        np.save(path / 'lsh_planes.npy', self.planes)
+        np.save(path / 'lsh_codes.npy', self.codes)
+        np.save(path / 'lsh_order.npy', self.order)
+
+    @classmethod
+    def load(cls, path, matrix, probes=1, **options):
+        path = Path(path)
+        if not (path / 'lsh_codes.npy').exists():
+            return None
+        return cls(
+            matrix,
+            np.load(path / 'lsh_planes.npy'),
+            np.load(path / 'lsh_codes.npy', mmap_mode='r'),
+            np.load(path / 'lsh_order.npy', mmap_mode='r'),
+            probes=probes,
+        )
+
+
+ENGINES = {engine.name: engine for engine in (ExactEngine, IVFEngine, HNSWEngine, LSHEngine)}
+
+
+def get_engine_class(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown recommendation engine '{name}'; choose one of {', '.join(ENGINES)}."
+        )
+
+
+def build_engine(name, matrix, **options):
+    return get_engine_class(name).build(matrix, **options)
+
+
+def save_engine(name, path, matrix, **options):
+    """Build an engine over ``matrix`` and save it to ``path`` for the workers to load."""
+    engine = build_engine(name, matrix, **options)
+    try:
+        engine.save(path)
+    except OSError:
+        logger.exception("Saving the '%s' recommendation engine to %s failed", name, path)
+    return engine
+
+
+def load_engine(name, path, matrix, **options):
+    """Load the engine saved in ``path``; without one, fall back to exact search."""
+    engine = get_engine_class(name).load(path, matrix, **options)
+    if engine is None:
+        logger.warning("No saved '%s' recommendation engine in %s; searching exactly. "
+                       "Run buildrecindex or compactrecindex to build it.", name, path)
+        engine = ExactEngine(matrix)
+    return engine
@@ -0,0 +1,180 @@
+"""Async favorites and recommendation views for ASGI deployments.
+
+Under ASGI, Django 3.2 runs every synchronous view on one shared thread, so a
+slow recommendation request holds up the cheap list and detail requests
+queued behind it. These views run on the event loop instead: database work
+goes to a bounded pool of threads that open and close their own connections
+(``database_sync_to_async``), and vector scoring to a separate bounded pool
+(``run_scoring``), so neither can starve the other or the sync views.
+
+DRF 3.13 cannot run async handlers, so these are plain Django views that
+authenticate with the configured DRF authentication classes and return the
+same payloads as ``FavoriteBooksAPIViewSet`` and ``RecommendationAPIViewSet``.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from .jobs import POLL_INTERVAL, queue_recommendations, recommendation_state
+from .models import Favorite
+from .recommender import DEFAULT_TOP_K, get_index
+from .serializers import FavoriteSerializer
+from .views import (
+    MAX_RECOMMENDATIONS, FavoriteBooksAPIViewSet, RecommendationAPIViewSet, latest_recommendations_payload,
+    recommended_card_data,
+)
+
+# Threads for ORM calls; each holds at most one database connection.
+db_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_DB_THREADS', 8), thread_name_prefix='async-db'
+)
+# Threads for NumPy/faiss scoring, which release the GIL in their heavy loops.
+scoring_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'RECOMMENDATION_SCORING_THREADS', 2), thread_name_prefix='scoring'
+)
+
+
+def _with_connection(func):
+    @wraps(func)
+    def call(*args, **kwargs):
+        # Pool threads never see request_started/request_finished, so they
+        # drop stale or expired connections around every call themselves.
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return call
+
+
+def database_sync_to_async(func):
+    """``sync_to_async`` for ORM code, run on ``db_executor``."""
+    return sync_to_async(_with_connection(func), thread_sensitive=False, executor=db_executor)
+
+
+async def run_scoring(func, *args):
+    """Run CPU-bound scoring on ``scoring_executor``."""
+    return await asyncio.get_running_loop().run_in_executor(scoring_executor, partial(func, *args))
+
+
+def _json(data, status=200):
+    """``data`` rendered by the JSON renderer the DRF views use, so both produce the same bytes."""
+    renderer = next(cls for cls in api_settings.DEFAULT_RENDERER_CLASSES if cls.format == 'json')()
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+def async_api_view(methods):
+    """Method check and authentication for an async view taking ``(request, user)``."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                user = await database_sync_to_async(_authenticate)(request)
+            except APIException as e:
+                return _json(e.detail if isinstance(e.detail, dict) else {"detail": e.detail}, status=e.status_code)
+            if user is None or not user.is_authenticated:
+                return _json({"detail": "Authentication credentials were not provided."}, status=401)
+            return await view(request, user, *args, **kwargs)
+
+        # Bearer-token API like the DRF views; Django 3.2's csrf_exempt cannot wrap coroutines.
+        wrapped.csrf_exempt = True
+        return wrapped
+    return decorator
+
+
+def _favorite_data(user):
+    favorites = Favorite.objects.filter(user=user).select_related('book').prefetch_related('book__authors')
+    return FavoriteSerializer(favorites, many=True).data
+
+
+def _add_favorite(user, book_id):
+    max_favorites = FavoriteBooksAPIViewSet.max_favorites
+    if Favorite.objects.filter(user=user).count() >= max_favorites:
+        return None, f"Max of {max_favorites} favorite books allowed."
+    favorite, created = Favorite.objects.get_or_create(user=user, book_id=book_id)
+    if created:
+        queue_recommendations(user.id)
+    return favorite, FavoriteSerializer(favorite).data
+
+
+@async_api_view(['GET', 'POST'])
+async def favorites(request, user):
+    if request.method == 'GET':
+        return _json(await database_sync_to_async(_favorite_data)(user))
+
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except ValueError:
+        return _json({"error": "Invalid JSON."}, status=400)
+    book_id = data.get('book_id') if hasattr(data, 'get') else None
+    if not book_id:
+        return _json({"error": "Book ID is required."}, status=400)
+
+    favorite, result = await database_sync_to_async(_add_favorite)(user, book_id)
+    if favorite is None:
+        return _json({"error": result}, status=400)
+    return _json({
+        "favorite": result,
+        "recommendations_url": request.build_absolute_uri(reverse("async-latest-recommendations")),
+    })
+
+
+def _favorite_ids_and_index(user):
+    return list(Favorite.objects.filter(user=user).values_list('book_id', flat=True)), get_index()
+
+
+@async_api_view(['GET'])
+async def recommendations(request, user):
+    """Recommend books for the profile formed by all of the user's favorites."""
+    try:
+        k = min(int(request.GET.get('k', DEFAULT_TOP_K)), MAX_RECOMMENDATIONS)
+    except ValueError:
+        return _json({"error": "k must be an integer."}, status=400)
+
+    favorite_ids, index = await database_sync_to_async(_favorite_ids_and_index)(user)
+    book_ids = await run_scoring(index.recommend_for_books, favorite_ids, k) if index is not None else []
+    return _json({
+        "recommendations": await database_sync_to_async(recommended_card_data)(book_ids)
+    })
+
+
+def _latest_state(user_id):
+    result, pending = recommendation_state(user_id)
+    if pending:
+        queue_recommendations(user_id)
+    return result, pending
+
+
+@async_api_view(['GET'])
+async def latest_recommendations(request, user):
+    """``RecommendationAPIViewSet.latest()``; a long poll only holds a coroutine, not a thread."""
+    try:
+        wait = min(max(float(request.GET.get('wait', 0)), 0), RecommendationAPIViewSet.max_wait)
+    except ValueError:
+        return _json({"error": "wait must be a number."}, status=400)
+
+    deadline = asyncio.get_running_loop().time() + wait
+    result, pending = await database_sync_to_async(_latest_state)(user.id)
+    while pending and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        result, pending = await database_sync_to_async(recommendation_state)(user.id)
+    return _json(await database_sync_to_async(latest_recommendations_payload)(result, pending))
@@ -0,0 +1,78 @@
+"""Streaming JSON lines exports of the catalog.
+
+Rows are read with ``QuerySet.iterator()`` and encoded one chunk at a time,
+so memory stays flat whatever the table size and the first chunk goes out as
+soon as the first database fetch returns. Values are encoded as the API's
+JSON renderer encodes them. Under ASGI, ``common.asgi.StreamingASGIHandler``
+produces the chunks on a thread of their own, off the event loop.
+"""
+import json
+import zlib
+from collections import defaultdict
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from apis.models import Author, Book
+
+EXPORT_CHUNK_SIZE = 2000
+BOOK_EXPORT_FIELDS = ('id', 'title', 'published_date', 'isbn', 'description', 'created_at', 'updated_at', 'is_active')
+AUTHOR_EXPORT_FIELDS = tuple(field.name for field in Author._meta.concrete_fields)
+
+
+def _chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode(rows):
+    text = ''.join(
+        json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n' for row in rows
+    )
+    # Escaped as JSONRenderer escapes them; tools splitting on any line break (str.splitlines()) see one row per line
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def author_lines(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``bytes`` of JSON lines, one line per author."""
+    rows = Author.objects.order_by('id').values(*AUTHOR_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunked(rows, chunk_size):
+        yield _encode(chunk)
+
+
+def book_lines(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``bytes`` of JSON lines, one line per book with its author ids.
+
+    Author ids are read with one through-table query per chunk.
+    """
+    rows = Book.objects.order_by('id').values(*BOOK_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    through = Book.authors.through
+    for chunk in _chunked(rows, chunk_size):
+        authors = defaultdict(list)
+        links = through.objects.filter(book_id__in=[row['id'] for row in chunk]).values_list('book_id', 'author_id')
+        for book_id, author_id in links:
+            authors[book_id].append(author_id)
+        for row in chunk:
+            row['authors'] = authors[row['id']]
+        yield _encode(chunk)
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of ``bytes``, flushing after every chunk so nothing waits for the end."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORTS = {
+    'books': book_lines,
+    'authors': author_lines,
+}
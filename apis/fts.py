@@ -0,0 +1,121 @@
+"""SQLite FTS5 tables behind book search, and the triggers keeping them in sync.
+
+Books and authors have text primary keys, so their implicit ``rowid`` is not
+stable: ``VACUUM`` may renumber it and Django's table rebuilds (how SQLite
+tables are altered) recreate it. Each FTS table is therefore keyed on its own
+``*_fts_key`` table, whose ``INTEGER PRIMARY KEY`` maps to the model's id, and
+stores its own copy of the indexed text.
+
+A table rebuild still drops the triggers with the old table, so
+``ensure_search_sync()`` runs after every ``migrate`` (see ``apis.signals``)
+to recreate any missing trigger and resynchronise the tables.
+"""
+
+TABLES = """
+CREATE TABLE apis_book_fts_key (id INTEGER PRIMARY KEY, book_id varchar(500) NOT NULL UNIQUE);
+CREATE VIRTUAL TABLE apis_book_fts USING fts5(title, description, tokenize='porter unicode61');
+CREATE TABLE apis_author_fts_key (id INTEGER PRIMARY KEY, author_id varchar(500) NOT NULL UNIQUE);
+CREATE VIRTUAL TABLE apis_author_fts USING fts5(name, tokenize='unicode61');
+"""
+
+TRIGGERS = {
+    'apis_book_fts_insert': """
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_insert AFTER INSERT ON apis_book BEGIN
+    INSERT INTO apis_book_fts_key(book_id) VALUES (new.id);
+    INSERT INTO apis_book_fts(rowid, title, description)
+    VALUES ((SELECT id FROM apis_book_fts_key WHERE book_id = new.id), new.title, new.description);
+END;
+""",
+    'apis_book_fts_delete': """
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_delete AFTER DELETE ON apis_book BEGIN
+    DELETE FROM apis_book_fts WHERE rowid = (SELECT id FROM apis_book_fts_key WHERE book_id = old.id);
+    DELETE FROM apis_book_fts_key WHERE book_id = old.id;
+END;
+""",
+    'apis_book_fts_update': """
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_update AFTER UPDATE OF id, title, description ON apis_book BEGIN
+    UPDATE apis_book_fts_key SET book_id = new.id WHERE book_id = old.id;
+    UPDATE apis_book_fts SET title = new.title, description = new.description
+    WHERE rowid = (SELECT id FROM apis_book_fts_key WHERE book_id = new.id);
+END;
+""",
+    'apis_author_fts_insert': """
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_insert AFTER INSERT ON apis_author BEGIN
+    INSERT INTO apis_author_fts_key(author_id) VALUES (new.id);
+    INSERT INTO apis_author_fts(rowid, name)
+    VALUES ((SELECT id FROM apis_author_fts_key WHERE author_id = new.id), new.name);
+END;
+""",
+    'apis_author_fts_delete': """
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_delete AFTER DELETE ON apis_author BEGIN
+    DELETE FROM apis_author_fts WHERE rowid = (SELECT id FROM apis_author_fts_key WHERE author_id = old.id);
+    DELETE FROM apis_author_fts_key WHERE author_id = old.id;
+END;
+""",
+    'apis_author_fts_update': """
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_update AFTER UPDATE OF id, name ON apis_author BEGIN
+    UPDATE apis_author_fts_key SET author_id = new.id WHERE author_id = old.id;
+    UPDATE apis_author_fts SET name = new.name
+    WHERE rowid = (SELECT id FROM apis_author_fts_key WHERE author_id = new.id);
+END;
+""",
+}
+
+# Refill both tables from apis_book and apis_author
+REBUILD = """
+DELETE FROM apis_book_fts;
+DELETE FROM apis_book_fts_key;
+INSERT INTO apis_book_fts_key(book_id) SELECT id FROM apis_book;
+INSERT INTO apis_book_fts(rowid, title, description)
+SELECT k.id, b.title, b.description FROM apis_book_fts_key k JOIN apis_book b ON b.id = k.book_id;
+DELETE FROM apis_author_fts;
+DELETE FROM apis_author_fts_key;
+INSERT INTO apis_author_fts_key(author_id) SELECT id FROM apis_author;
+INSERT INTO apis_author_fts(rowid, name)
+SELECT k.id, a.name FROM apis_author_fts_key k JOIN apis_author a ON a.id = k.author_id;
+"""
+
+DROP = """
+DROP TRIGGER IF EXISTS apis_book_fts_insert;
+DROP TRIGGER IF EXISTS apis_book_fts_delete;
+DROP TRIGGER IF EXISTS apis_book_fts_update;
+DROP TRIGGER IF EXISTS apis_author_fts_insert;
+DROP TRIGGER IF EXISTS apis_author_fts_delete;
+DROP TRIGGER IF EXISTS apis_author_fts_update;
+DROP TABLE IF EXISTS apis_book_fts;
+DROP TABLE IF EXISTS apis_book_fts_key;
+DROP TABLE IF EXISTS apis_author_fts;
+DROP TABLE IF EXISTS apis_author_fts_key;
+"""
+
+
+def create_search_tables(cursor):
+    cursor.executescript(TABLES + ''.join(TRIGGERS.values()) + REBUILD)
+
+
+def drop_search_tables(cursor):
+    cursor.executescript(DROP)
+
+
+def rebuild_search_tables(cursor):
+    cursor.executescript(REBUILD)
+
+
+def ensure_search_sync(connection):
+    """Recreate missing search triggers on SQLite; returns whether the tables were rebuilt.
+
+    Does nothing on other databases, or before the FTS tables are migrated in.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        names = ['apis_book_fts_key', *TRIGGERS]
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if 'apis_book_fts_key' not in existing or set(TRIGGERS) <= existing:
+            return False
+        # Rows written while a trigger was missing are unknown: refill the tables from scratch.
+        cursor.executescript(''.join(TRIGGERS.values()) + REBUILD)
+    return True
@@ -0,0 +1 @@
+"""Building blocks shared by the ``importdata`` and ``importbook`` commands."""
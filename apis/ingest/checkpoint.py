@@ -0,0 +1,68 @@
+"""Resume points for interrupted imports.
+
+A checkpoint sits next to the input file as ``<file>.checkpoint`` and records,
+for every byte range the file was split into, the offset just past the last
+batch that was committed, plus the number of committed batches. It is
+rewritten atomically after each commit, so a crash loses at most the batch
+in flight.
+"""
+import json
+import os
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class Checkpoint:
+
+    def __init__(self, input_path, ranges, batches=0, size=None, mode=None):
+        self.input_path = input_path
+        self.path = f'{input_path}.checkpoint'
+        # [start, end, offset] per range; the range is done once offset reaches end
+        self.ranges = [list(item) if len(item) == 3 else [item[0], item[1], item[0]] for item in ranges]
+        self.batches = batches
+        self.size = os.path.getsize(input_path) if size is None else size
+        self.mode = mode
+
+    @classmethod
+    def load(cls, input_path, mode=None):
+        """Read the checkpoint of ``input_path``; raises ``CheckpointError`` if it is missing or stale."""
+        path = f'{input_path}.checkpoint'
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            raise CheckpointError(f'No checkpoint found at {path}')
+        except ValueError as e:
+            raise CheckpointError(f'Unreadable checkpoint {path}: {e}')
+        if data['size'] != os.path.getsize(input_path):
+            raise CheckpointError(f'{input_path} changed size since the checkpoint was written')
+        if data.get('mode') != mode:
+            raise CheckpointError(f"The checkpoint was written by a {data.get('mode') or 'plain'} import")
+        return cls(input_path, data['ranges'], data['batches'], data['size'], data.get('mode'))
+
+    def remaining(self):
+        """``(start, end)`` per range, starting at its resume offset; finished ranges are empty."""
+        return [(offset, end) for _, end, offset in self.ranges]
+
+    def advance(self, part, offset):
+        """Record that range ``part`` is committed up to ``offset`` and save."""
+        self.ranges[part][2] = offset
+        self.batches += 1
+        self.save()
+
+    def save(self):
+        data = {'size': self.size, 'mode': self.mode, 'batches': self.batches, 'ranges': self.ranges}
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,205 @@
+"""PostgreSQL ``COPY`` fast-load path.
+
+Parsed rows are streamed into an unlogged staging table per target table with
+``COPY ... FROM STDIN`` from an in-memory buffer, then merged into the real
+table with a single ``INSERT ... SELECT ... ON CONFLICT`` statement.
+"""
+import hashlib
+import io
+import json
+import os
+from datetime import date, datetime
+
+from django.db import connection, transaction
+
+# Values Django fills in on save(); the merge sets them in SQL instead.
+MERGE_DEFAULTS = {'created_at': 'now()', 'updated_at': 'now()', 'is_active': 'true'}
+
+
+def staging_key(path):
+    """Stable suffix for the staging tables of one input file."""
+    return hashlib.md5(os.path.abspath(path).encode()).hexdigest()[:10]
+
+
+def copy_value(value):
+    """Encode one value for ``COPY``'s text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    elif isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    elif isinstance(value, bool):
+        value = 't' if value else 'f'
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class StagingTable:
+    """An unlogged table shaped like some of ``model``'s columns, filled with ``COPY``."""
+
+    def __init__(self, model, fields, key):
+        self.model = model
+        self.fields = [model._meta.get_field(name) for name in fields]
+        self.columns = [field.column for field in self.fields]
+        self.name = f'{model._meta.db_table}_staging_{key}'
+
+    def create(self):
+        quote = connection.ops.quote_name
+        columns = ', '.join(f'{quote(field.column)} {field.db_type(connection)}' for field in self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE UNLOGGED TABLE IF NOT EXISTS {quote(self.name)} ({columns})')
+
+    def truncate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {connection.ops.quote_name(self.name)}')
+
+    def drop(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(self.name)}')
+
+    def copy(self, rows):
+        """Stream ``rows`` (sequences in column order) into the table; returns the row count."""
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write('\t'.join(map(copy_value, row)))
+            buffer.write('\n')
+            count += 1
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(self.name)} ({', '.join(map(quote, self.columns))}) FROM STDIN",
+                buffer,
+            )
+        return count
+
+
+class CopyLoader:
+    """Stage rows for ``model`` and merge them into its table in one statement."""
+
+    def __init__(self, model, fields, key):
+        self.model = model
+        self.staging = StagingTable(model, fields, key)
+
+    def prepare(self, resume=False):
+        """Create the staging table; unless resuming, empty it of a previous run's rows."""
+        self.staging.create()
+        if not resume:
+            self.staging.truncate()
+
+    def stage(self, records):
+        """Stage field dicts as produced by ``apis.ingest.records``."""
+        names = [field.name for field in self.staging.fields]
+        return self.staging.copy([record[name] for name in names] for record in records)
+
+    def merge_sql(self, upsert=False):
+        quote = connection.ops.quote_name
+        meta = self.model._meta
+        table = quote(meta.db_table)
+        pk = quote(meta.pk.column)
+        columns = list(map(quote, self.staging.columns))
+        defaults = {
+            quote(meta.get_field(name).column): sql
+            for name, sql in MERGE_DEFAULTS.items()
+            if name in {field.name for field in meta.concrete_fields} and name not in self.staging.columns
+        }
+        # One row per primary key (the last one staged), then one per other unique column.
+        rows = f'SELECT DISTINCT ON ({pk}) * FROM {quote(self.staging.name)} ORDER BY {pk}, ctid DESC'
+        unique = [quote(field.column) for field in self.staging.fields if field.unique and not field.primary_key]
+        for column in unique:
+            rows = (
+                f'SELECT * FROM (SELECT s.*, row_number() OVER (PARTITION BY {column} ORDER BY {pk}) AS dup_ '
+                f'FROM ({rows}) s) d WHERE dup_ = 1'
+            )
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns + list(defaults))}) "
+            f"SELECT {', '.join(columns + list(defaults.values()))} FROM ({rows}) staged "
+        )
+        returning = f' RETURNING {table}.{pk}'
+        if not upsert:
+            return sql + 'ON CONFLICT DO NOTHING' + returning
+
+        # ON CONFLICT (pk) cannot absorb a clash on another unique column: skip those rows.
+        clashes = [
+            f'NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{column} = staged.{column} AND t.{pk} <> staged.{pk})'
+            for column in unique
+        ]
+        if clashes:
+            sql += f"WHERE {' AND '.join(clashes)} "
+        updates = [column for column in columns if column != pk]
+        assignments = [f'{column} = EXCLUDED.{column}' for column in updates]
+        if quote('updated_at') in defaults:
+            assignments.append(f"{quote('updated_at')} = now()")
+        changed = ' OR '.join(f'{table}.{column} IS DISTINCT FROM EXCLUDED.{column}' for column in updates)
+        return sql + f"ON CONFLICT ({pk}) DO UPDATE SET {', '.join(assignments)} WHERE {changed}" + returning
+
+    def merge(self, upsert=False):
+        """Insert staged rows, updating changed existing ones with ``upsert``.
+
+        Returns the primary keys of the rows written.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(self.merge_sql(upsert))
+            return [pk for pk, in cursor.fetchall()]
+
+    def drop(self):
+        self.staging.drop()
+
+
+class LinkCopyLoader:
+    """Stage ``(source_id, target_id)`` pairs for an auto-created M2M through table."""
+
+    def __init__(self, many_to_many, key):
+        self.through = many_to_many.through
+        self.source_field = many_to_many.field.m2m_field_name()
+        self.target_field = many_to_many.field.m2m_reverse_field_name()
+        self.staging = StagingTable(self.through, [self.source_field, self.target_field], key)
+
+    def prepare(self, resume=False):
+        """Create the staging table; unless resuming, empty it of a previous run's rows."""
+        self.staging.create()
+        if not resume:
+            self.staging.truncate()
+
+    def stage(self, pairs):
+        return self.staging.copy(pairs)
+
+    def merge(self, upsert=False):
+        """Insert staged pairs whose two ends both exist; returns the rows inserted.
+
+        Links are only ever added, so ``upsert`` changes nothing here.
+        """
+        quote = connection.ops.quote_name
+        meta = self.through._meta
+        source = meta.get_field(self.source_field)
+        target = meta.get_field(self.target_field)
+        source_table = quote(source.related_model._meta.db_table)
+        target_table = quote(target.related_model._meta.db_table)
+        source_column, target_column = quote(source.column), quote(target.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(meta.db_table)} ({source_column}, {target_column}) "
+                f"SELECT DISTINCT s.{source_column}, s.{target_column} FROM {quote(self.staging.name)} s "
+                f"JOIN {source_table} src ON src.{quote(source.target_field.column)} = s.{source_column} "
+                f"JOIN {target_table} tgt ON tgt.{quote(target.target_field.column)} = s.{target_column} "
+                f"ON CONFLICT DO NOTHING"
+            )
+            return cursor.rowcount
+
+    def drop(self):
+        self.staging.drop()
+
+
+def merge_all(loaders, upsert=False):
+    """Merge every loader's staging table in one transaction, then drop them.
+
+    Returns what each loader's ``merge()`` returned, in order.
+    """
+    with transaction.atomic():
+        counts = [loader.merge(upsert) for loader in loaders]
+    for loader in loaders:
+        loader.drop()
+    return counts
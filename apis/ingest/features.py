@@ -0,0 +1,119 @@
+"""Recommendation features computed in the same pass that parses a books file.
+
+Hashed term counts need no fitted vocabulary, so each parser process tokenizes
+and hashes its own batches (``HashedFeatures``). The writer spools every
+stored batch's counts next to the input file (``FeatureSpool``), keyed by the
+batch's range and offset, so resumed imports keep what earlier runs spooled.
+Once the file is done the counts are IDF-weighted and written as a new
+recommendation index version (``build_hashed_index``) without reading
+``apis_book`` back. The index then holds the imported books only, so this
+is for loading an empty catalog; ``manage.py buildrecindex`` covers the rest.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from apis.recommender import book_text, reduce_dimensions, write_index
+
+HASH_FEATURES = 2 ** 20
+STOP_WORDS = 'english'
+
+
+class HashedFeatures:
+    """Batch finisher for ``read_batches``: pairs parsed book records with their term counts."""
+
+    def __init__(self, n_features=HASH_FEATURES, stop_words=STOP_WORDS):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+            stop_words=stop_words,
+            dtype=np.float32,
+        )
+
+    def __call__(self, records):
+        texts = [book_text(fields['title'], fields['description']) for fields, _ in records]
+        return records, self.vectorizer.transform(texts)
+
+
+class FeatureSpool:
+    """Per-batch ``(book ids, counts)`` files in ``<input>.features/``."""
+
+    def __init__(self, input_path):
+        self.path = Path(f'{input_path}.features')
+
+    def exists(self):
+        return self.path.is_dir()
+
+    def prepare(self, resume=False):
+        if not resume:
+            self.clear()
+        self.path.mkdir(exist_ok=True)
+
+    def add(self, part, offset, book_ids, counts):
+        name = f'{part:04d}-{offset:016d}'
+        with open(self.path / f'{name}.json', 'w') as file:
+            json.dump(book_ids, file)
+        # The counts land last and atomically: a batch is spooled once its .npz exists.
+        temporary = self.path / f'{name}.tmp.npz'
+        sparse.save_npz(temporary, counts.tocsr())
+        os.replace(temporary, self.path / f'{name}.npz')
+
+    def load(self, first_wins=False):
+        """``(book_ids, counts)`` of every spooled batch; a later row wins for a repeated id unless ``first_wins``."""
+        book_ids, blocks = [], []
+        for counts_path in sorted(self.path.glob('*[0-9].npz')):
+            with open(counts_path.with_suffix('.json')) as file:
+                book_ids += json.load(file)
+            blocks.append(sparse.load_npz(counts_path))
+        if not blocks:
+            return [], None
+        counts = sparse.vstack(blocks).tocsr()
+        kept = {}
+        for row, book_id in enumerate(book_ids):
+            if not first_wins or book_id not in kept:
+                kept[book_id] = row
+        rows = sorted(kept.values())
+        return [book_ids[row] for row in rows], counts[rows]
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def build_hashed_index(book_ids, counts, dims, min_df=2, stop_words=STOP_WORDS, **meta):
+    """Write a recommendation index version from hashed term counts; returns its path.
+
+    Buckets found in fewer than ``min_df`` books are dropped, the rest are
+    weighted with the same smoothed IDF ``TfidfVectorizer`` uses.
+    """
+    from sklearn.preprocessing import normalize
+
+    n_features = counts.shape[1]
+    counts = counts.tocsc()
+    df = np.diff(counts.indptr)
+    buckets = np.flatnonzero(df >= min(min_df, len(book_ids)))
+    if not len(buckets):
+        raise ValueError('no terms left after pruning')
+    counts = counts[:, buckets].tocsr()
+    idf = np.log((1 + len(book_ids)) / (1 + df[buckets])) + 1
+    tfidf = normalize(sparse.csr_matrix(counts.multiply(idf)))
+
+    matrix, components = reduce_dimensions(tfidf, dims)
+    path = write_index(
+        matrix.astype(np.float32),
+        book_ids,
+        {str(bucket): column for column, bucket in enumerate(buckets)},
+        idf,
+        components=components,
+        stop_words=stop_words,
+        vectorizer='hashing',
+        n_features=n_features,
+        **meta,
+    )
+    return path
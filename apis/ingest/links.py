@@ -0,0 +1,48 @@
+from apis.models import Author, Book
+
+
+def link_book_authors(pairs):
+    """Write ``Book.authors`` rows for ``(book_id, author_id)`` pairs in bulk.
+
+    Known author and book ids are resolved with one ``values_list`` query each;
+    pairs naming an unknown author or book are skipped. All rows are written
+    with a single ``bulk_create``. Returns the number of rows sent.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return 0
+    author_ids = set(Author.objects.filter(id__in={author_id for _, author_id in pairs}).values_list('id', flat=True))
+    book_ids = set(Book.objects.filter(id__in={book_id for book_id, _ in pairs}).values_list('id', flat=True))
+
+    through = Book.authors.through
+    rows = [
+        through(book_id=book_id, author_id=author_id)
+        for book_id, author_id in pairs
+        if book_id in book_ids and author_id in author_ids
+    ]
+    through.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def unlink_book_authors(side, ids):
+    """Delete the ``Book.authors`` rows of the given books (``side='book'``) or authors (``'author'``)."""
+    deleted, _ = Book.authors.through.objects.filter(**{f'{side}_id__in': ids}).delete()
+    return deleted
+
+
+def author_book_pairs(chunk_size):
+    """Yield ``(author_ids, pairs)`` chunks of ``(book_id, author_id)`` pairs from ``Author.book_ids``.
+
+    Authors are streamed with ``.iterator()``; a chunk closes once it holds
+    ``chunk_size`` pairs, so a prolific author never makes one unbounded.
+    """
+    author_ids, pairs = [], []
+    rows = Author.objects.order_by('id').values_list('id', 'book_ids')
+    for author_id, book_ids in rows.iterator(chunk_size=chunk_size):
+        author_ids.append(author_id)
+        pairs.extend((str(book_id), author_id) for book_id in book_ids or ())
+        if len(pairs) >= chunk_size:
+            yield author_ids, pairs
+            author_ids, pairs = [], []
+    if author_ids:
+        yield author_ids, pairs
@@ -0,0 +1,111 @@
+"""Line-oriented batch reading of JSONL files, optionally across a process pool.
+
+The file is split into byte ranges aligned to line boundaries; each range is
+parsed by its own process and parsed batches stream back to the single
+database writer through a bounded queue, so parsing never runs far ahead of
+what the writer can absorb.
+"""
+import os
+from multiprocessing import get_context
+
+from apis.ingest.readers import compression, iter_lines
+
+# Batches each parser may have waiting in the queue before it blocks
+QUEUE_BATCHES_PER_WORKER = 2
+
+
+def line_ranges(path, parts):
+    """Split ``path`` into up to ``parts`` ``(start, end)`` byte ranges on line boundaries.
+
+    A compressed file cannot be split and is always one ``(0, None)`` range.
+    """
+    if compression(path):
+        return [(0, None)]
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as file:
+        for part in range(1, parts):
+            file.seek(max(size * part // parts, boundaries[-1]))
+            if file.tell() > 0:
+                file.seek(file.tell() - 1)
+                file.readline()  # finish the line the cut landed in
+            boundaries.append(min(file.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def iter_batches(path, parse, batch_size, start=0, end=None, finish=None):
+    """Yield ``(offset, records)`` for the lines in ``[start, end)``.
+
+    ``offset`` is the byte position just past the batch, so reading can resume
+    there once the batch is stored. ``finish``, if given, is applied to each
+    batch's list of records before it is yielded.
+    """
+    finish = finish or (lambda records: records)
+    records = []
+    position = start
+    for position, line in iter_lines(path, start, end):
+        if line.strip():
+            records.append(parse(line))
+        if len(records) >= batch_size:
+            yield position, finish(records)
+            records = []
+    if records:
+        yield position, finish(records)
+
+
+def _parse_range(path, parse, batch_size, part, start, end, finish, queue):
+    try:
+        for offset, records in iter_batches(path, parse, batch_size, start, end, finish):
+            queue.put((part, offset, records, None))
+    except Exception as e:
+        queue.put((part, None, None, e))
+        return
+    queue.put((part, None, None, None))
+
+
+def read_batches(path, parse, batch_size, workers=1, ranges=None, finish=None):
+    """Yield ``(part, offset, records)`` batches parsed from ``path``.
+
+    With ``workers > 1`` the ranges (by default ``line_ranges(path, workers)``)
+    are parsed in parallel processes and batches arrive in completion order;
+    batches of one part always arrive in file order. ``finish`` runs on each
+    batch in the parser process, so it must be picklable. A parser error is
+    re-raised here, in the writer.
+    """
+    ranges = ranges or line_ranges(path, workers)
+    if workers <= 1:
+        for part, (start, end) in enumerate(ranges):
+            for offset, records in iter_batches(path, parse, batch_size, start, end, finish):
+                yield part, offset, records
+        return
+
+    context = get_context('spawn')
+    queue = context.Queue(maxsize=QUEUE_BATCHES_PER_WORKER * workers)
+    processes = [
+        context.Process(
+            target=_parse_range, args=(path, parse, batch_size, part, start, end, finish, queue), daemon=True
+        )
+        for part, (start, end) in enumerate(ranges)
+    ]
+    running = set()
+    try:
+        # At most `workers` parsers run at once; the rest start as others finish.
+        pending = list(enumerate(processes))
+        while pending or running:
+            while pending and len(running) < workers:
+                part, process = pending.pop(0)
+                process.start()
+                running.add(part)
+            part, offset, records, error = queue.get()
+            if error is not None:
+                raise error
+            if records is None:
+                running.discard(part)
+                processes[part].join()
+                continue
+            yield part, offset, records
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
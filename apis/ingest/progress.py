@@ -0,0 +1,39 @@
+"""Throughput reporting for the import commands."""
+import time
+
+REPORT_SECONDS = 5.0
+
+
+class Progress:
+    """Bytes/sec and rows/sec over the batches of one import, reported every few seconds.
+
+    Bytes are counted from the batch offsets of each range, so for compressed
+    inputs they are decompressed bytes and no percentage is shown.
+    """
+
+    def __init__(self, ranges, write, interval=REPORT_SECONDS):
+        self.positions = {part: start for part, (start, _) in enumerate(ranges)}
+        ends = [end for _, end in ranges]
+        self.total = None if None in ends else sum(end - start for start, end in ranges)
+        self.write = write
+        self.interval = interval
+        self.bytes = 0
+        self.rows = 0
+        self.started = self.reported = time.monotonic()
+
+    def update(self, part, offset, rows):
+        self.bytes += offset - self.positions[part]
+        self.positions[part] = offset
+        self.rows += rows
+        if time.monotonic() - self.reported >= self.interval:
+            self.report()
+
+    def report(self):
+        self.reported = time.monotonic()
+        elapsed = max(self.reported - self.started, 1e-9)
+        megabytes = self.bytes / (1024 * 1024)
+        done = f' ({100 * self.bytes / self.total:.1f}%)' if self.total else ''
+        self.write(
+            f'{self.rows:,} rows, {megabytes:,.1f} MB{done} in {elapsed:.1f}s: '
+            f'{self.rows / elapsed:,.0f} rows/s, {megabytes / elapsed:,.1f} MB/s'
+        )
@@ -0,0 +1,85 @@
+"""Byte-line readers for import files, plain or compressed.
+
+Plain files are memory-mapped and split on ``b'\\n'`` without decoding, so
+lines reach ``json.loads`` as bytes. ``.gz``, ``.bz2`` and ``.zst`` files are
+decompressed as a stream, chosen by extension; their offsets count
+decompressed bytes, and since a compressed stream cannot be seeked into,
+resuming one means reading past the bytes already imported.
+
+``.zst`` support needs the optional ``zstandard`` package (requirements-optional.txt).
+"""
+import bz2
+import gzip
+import io
+import mmap
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; only .zst inputs need it
+    zstandard = None
+
+READ_BUFFER = 1024 * 1024
+
+
+def _open_zstd(path):
+    if zstandard is None:
+        raise ImportError('Reading .zst files requires the zstandard package')
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    return io.BufferedReader(reader, READ_BUFFER)
+
+
+OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.zst': _open_zstd,
+}
+
+
+def compression(path):
+    """The compressed-file extension of ``path``, or ``None`` for a plain file."""
+    extension = os.path.splitext(str(path))[1].lower()
+    return extension if extension in OPENERS else None
+
+
+def _mapped_lines(path, start, end):
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if start >= size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if hasattr(view, 'madvise'):
+                view.madvise(mmap.MADV_SEQUENTIAL)
+            end = size if end is None else min(end, size)
+            position = start
+            while position < end:
+                newline = view.find(b'\n', position)
+                stop = size if newline < 0 else newline + 1
+                yield stop, view[position:stop]
+                position = stop
+
+
+def _streamed_lines(path, start, end):
+    with OPENERS[compression(path)](path) as stream:
+        position = 0
+        while position < start:
+            skipped = len(stream.read(min(READ_BUFFER, start - position)))
+            if not skipped:
+                return
+            position += skipped
+        for line in stream:
+            position += len(line)
+            yield position, line
+            if end is not None and position >= end:
+                return
+
+
+def iter_lines(path, start=0, end=None):
+    """Yield ``(offset, line)`` for the lines from byte ``start`` until one ends at or past ``end``.
+
+    ``line`` is ``bytes`` including its newline; ``offset`` is the position
+    just past it.
+    """
+    if compression(path):
+        return _streamed_lines(path, start, end)
+    return _mapped_lines(path, start, end)
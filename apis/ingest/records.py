@@ -0,0 +1,71 @@
+"""Parsing of Goodreads-style JSON lines into plain field dicts.
+
+Only the standard library is used here so parser processes can import it
+without setting up Django.
+"""
+import json
+from datetime import datetime
+
+AUTHOR_FIELDS = (
+    'id', 'name', 'gender', 'image_url', 'about', 'ratings_count', 'average_rating',
+    'text_reviews_count', 'work_ids', 'book_ids', 'works_count', 'fans_count',
+)
+BOOK_FIELDS = ('id', 'title', 'published_date', 'isbn', 'description')
+
+
+def parse_date(date_str):
+    """Parse date string to a date object. Returns None if parsing fails."""
+    formats = ['%Y-%m-%d', '%Y-%m', '%Y']
+    for fmt in formats:
+        try:
+            if date_str:
+                # If the date format is YYYY-MM, set day to 01
+                if fmt == '%Y-%m' and len(date_str) == 7:
+                    return datetime.strptime(date_str + '-01', fmt + '-%d').date()
+                # If the date format is YYYY, set month and day to 01
+                elif fmt == '%Y' and len(date_str) == 4:
+                    return datetime.strptime(date_str + '-01-01', fmt + '-%m-%d').date()
+                else:
+                    return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_author(item):
+    """``Author`` field values from one decoded authors.json object."""
+    return {
+        'id': item.get('id'),
+        'name': item.get('name'),
+        'gender': item.get('gender', ''),
+        'image_url': item.get('image_url', ''),
+        'about': item.get('about', ''),
+        'ratings_count': item.get('ratings_count', 0),
+        'average_rating': item.get('average_rating', 0.0),
+        'text_reviews_count': item.get('text_reviews_count', 0),
+        'work_ids': item.get('work_ids', []),
+        'book_ids': item.get('book_ids', []),
+        'works_count': item.get('works_count', 0),
+        'fans_count': item.get('fans_count', 0),
+    }
+
+
+def parse_book(item, date_parser=parse_date):
+    """``(Book field values, author ids)`` from one decoded books.json object."""
+    fields = {
+        'id': item.get('id'),
+        'title': item.get('title'),
+        'published_date': date_parser(item.get('publication_date', '')),
+        'isbn': item.get('isbn13', '') or item.get('isbn', ''),
+        'description': item.get('description', ''),
+    }
+    author_ids = [author['id'] for author in item.get('authors', []) if author.get('id')]
+    return fields, author_ids
+
+
+def parse_author_line(line):
+    return parse_author(json.loads(line))
+
+
+def parse_book_line(line):
+    return parse_book(json.loads(line))
@@ -0,0 +1,208 @@
+"""Per-stage timing, query counts and profiling for the import commands.
+
+Writer-side stages are timed with ``ImportStats.stage()``; nested stages are
+exclusive, so a parent's time does not include its children's. Queries are
+attributed to the innermost stage by installing the ``ImportStats`` instance
+with ``connection.execute_wrapper()``. Parsing stages are timed inside the
+parser processes by ``TimedParser`` and shipped back with each batch.
+
+Nothing here imports Django, so ``TimedParser`` can run in parser processes.
+"""
+import cProfile
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from apis.ingest.records import parse_date
+
+# Stages timed in the parser processes; with --workers their seconds add up across processes.
+PARSER_STAGES = ('decode', 'dates', 'fields', 'features')
+
+
+class TimedParser:
+    """``parse`` callable for ``read_batches`` that times decoding and field extraction.
+
+    Pass the instance as ``parse`` and its ``finish`` method as ``finish``:
+    they are pickled together, so each parser process shares one instance.
+    Batches then arrive as ``(records, timings)``. ``then`` is an optional
+    further batch finisher, timed as ``features``.
+    """
+
+    def __init__(self, parse_item, then=None, dates=False):
+        self.parse_item = parse_item
+        self.then = then
+        self.dates = dates
+        self.timings = Counter()
+
+    def _parse_date(self, value):
+        started = time.perf_counter()
+        try:
+            return parse_date(value)
+        finally:
+            self.timings['dates'] += time.perf_counter() - started
+
+    def __call__(self, line):
+        started = time.perf_counter()
+        item = json.loads(line)
+        decoded = time.perf_counter()
+        dates = self.timings['dates']
+        if self.dates:
+            result = self.parse_item(item, date_parser=self._parse_date)
+        else:
+            result = self.parse_item(item)
+        self.timings['decode'] += decoded - started
+        self.timings['fields'] += time.perf_counter() - decoded - (self.timings['dates'] - dates)
+        return result
+
+    def finish(self, records):
+        timings, self.timings = self.timings, Counter()
+        if self.then is not None:
+            started = time.perf_counter()
+            records = self.then(records)
+            timings['features'] += time.perf_counter() - started
+        return records, dict(timings)
+
+
+class ImportStats:
+    """Seconds, rows and queries per stage of one import run."""
+
+    def __init__(self, inline_parsing=True, profile_path=None):
+        # When parsing runs inline, its time is inside 'read' and is moved out of it.
+        self.inline_parsing = inline_parsing
+        self.profile_path = profile_path
+        self.seconds = Counter()
+        self.rows = Counter()
+        self.queries = Counter()
+        self.query_seconds = Counter()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.batches = 0
+        self.hottest = None  # (seconds, batch number)
+        self._profile = None
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        now = time.perf_counter()
+        if self._stack:
+            parent, since = self._stack[-1]
+            self.seconds[parent] += now - since
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _, since = self._stack.pop()
+            self.seconds[name] += end - since
+            self.rows[name] += rows
+            if self._stack:
+                self._stack[-1][1] = end
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook: count the query against the current stage."""
+        name = self._stack[-1][0] if self._stack else 'other'
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries[name] += 1
+            self.query_seconds[name] += time.perf_counter() - started
+
+    def add_parsed(self, timings, rows):
+        """Fold in the parser-side timings of a batch of ``rows`` records."""
+        for name, seconds in timings.items():
+            self.seconds[name] += seconds
+            self.rows[name] += rows
+            if self.inline_parsing:
+                self.seconds['read'] -= seconds
+
+    def track(self, batches):
+        """Iterate ``batches``, timing the wait for each as ``read`` and finding the slowest batch.
+
+        With a profile path, each batch (its read and everything done with it
+        until the next one is requested) runs under cProfile and the profile
+        of the slowest is kept.
+        """
+        iterator = iter(batches)
+        while True:
+            profile = cProfile.Profile() if self.profile_path else None
+            started = time.perf_counter()
+            if profile:
+                profile.enable()
+            try:
+                with self.stage('read'):
+                    batch = next(iterator)
+            except StopIteration:
+                if profile:
+                    profile.disable()
+                return
+            try:
+                yield batch
+            finally:
+                if profile:
+                    profile.disable()
+            self.batches += 1
+            elapsed = time.perf_counter() - started
+            if self.hottest is None or elapsed > self.hottest[0]:
+                self.hottest = (elapsed, self.batches)
+                self._profile = profile
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self._profile is not None:
+            self._profile.dump_stats(self.profile_path)
+
+    def report(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        stages = {}
+        # Parser stages first in pipeline order, then writer stages as first seen, 'other' last
+        order = {name: position for position, name in enumerate(PARSER_STAGES)}
+        names = dict.fromkeys([*self.seconds, *self.queries])
+        for name in sorted(names, key=lambda name: (order.get(name, len(order)), name == 'other')):
+            seconds = max(self.seconds[name], 0.0)
+            stages[name] = {
+                'seconds': round(seconds, 6),
+                'rows': self.rows[name],
+                'rows_per_second': round(self.rows[name] / seconds, 1) if seconds and self.rows[name] else None,
+                'queries': self.queries[name],
+                'query_seconds': round(self.query_seconds[name], 6),
+                'in_parsers': name in PARSER_STAGES,
+            }
+        report = {
+            'wall_seconds': round(wall, 6),
+            'batches': self.batches,
+            'queries': sum(self.queries.values()),
+            'stages': stages,
+        }
+        if self.hottest:
+            report['hottest_batch'] = {'number': self.hottest[1], 'seconds': round(self.hottest[0], 6)}
+        if self._profile is not None:
+            report['profile'] = str(self.profile_path)
+        return report
+
+    def write(self, path, **context):
+        """Save the report as JSON, with ``context`` (command, input file, ...) at the top level."""
+        with open(path, 'w') as file:
+            json.dump(dict(context, **self.report()), file, indent=2)
+            file.write('\n')
+
+    def table(self):
+        """The report as lines of a fixed-width summary table."""
+        report = self.report()
+        lines = [f"{'stage':<12}{'seconds':>10}{'rows':>12}{'rows/s':>12}{'queries':>10}{'query s':>10}"]
+        for name, stage in report['stages'].items():
+            rate = f"{stage['rows_per_second']:,.0f}" if stage['rows_per_second'] else '-'
+            label = f"{name}*" if stage['in_parsers'] else name
+            lines.append(
+                f"{label:<12}{stage['seconds']:>10.3f}{stage['rows']:>12,}{rate:>12}"
+                f"{stage['queries']:>10}{stage['query_seconds']:>10.3f}"
+            )
+        lines.append(
+            f"{report['batches']} batches, {report['queries']} queries in {report['wall_seconds']:.2f}s"
+            f" (* timed in the parser processes)"
+        )
+        if 'hottest_batch' in report:
+            hottest = report['hottest_batch']
+            lines.append(f"Slowest batch: #{hottest['number']} in {hottest['seconds']:.3f}s")
+        return lines
@@ -0,0 +1,113 @@
+"""Bulk ``INSERT ... ON CONFLICT (pk) DO UPDATE`` for the import commands.
+
+Django 3.2's ``bulk_create`` can only ignore conflicts, so changed upstream
+records would never be refreshed. The statement is built by hand; it is
+valid on PostgreSQL and on SQLite 3.24+. Rows whose values are unchanged are
+left alone, so ``updated_at`` only moves for records that really changed.
+"""
+from django.db import connection
+from django.utils import timezone
+
+from common.batch_mixins import batch_saved
+
+# Columns set on insert but never overwritten by an update.
+INSERT_ONLY = ('created_at', 'is_active')
+
+
+def distinct_from(left, right):
+    if connection.vendor == 'postgresql':
+        return f'{left} IS DISTINCT FROM {right}'
+    return f'{left} IS NOT {right}'
+
+
+def skip_unique_clashes(model, fields, records):
+    """Drop records that would violate a unique column other than the primary key.
+
+    Within ``records`` the last record per primary key wins and the first per
+    unique value is kept; records whose unique value already belongs to a
+    different row in the table are dropped.
+    """
+    pk = model._meta.pk.name
+    records = list({record[pk]: record for record in records}.values())
+    for name in fields:
+        field = model._meta.get_field(name)
+        if not field.unique or field.primary_key:
+            continue
+        owners = dict(
+            model._default_manager.filter(**{f'{name}__in': {record[name] for record in records}})
+            .values_list(name, pk)
+        )
+        seen = set()
+        kept = []
+        for record in records:
+            value = record[name]
+            if value in seen or owners.get(value, record[pk]) != record[pk]:
+                continue
+            seen.add(value)
+            kept.append(record)
+        records = kept
+    return records
+
+
+def upsert_sql(model, fields, rows):
+    meta = model._meta
+    quote = connection.ops.quote_name
+    concrete = {field.name for field in meta.concrete_fields}
+    extra = [name for name in ('created_at', 'updated_at', 'is_active') if name in concrete]
+    columns = [quote(meta.get_field(name).column) for name in list(fields) + extra]
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+
+    updates = [name for name in fields if not meta.get_field(name).primary_key]
+    table = quote(meta.db_table)
+    changed = ' OR '.join(
+        distinct_from(f'{table}.{quote(meta.get_field(name).column)}', f'EXCLUDED.{quote(meta.get_field(name).column)}')
+        for name in updates
+    )
+    assignments = [
+        f'{quote(meta.get_field(name).column)} = EXCLUDED.{quote(meta.get_field(name).column)}'
+        for name in updates + [name for name in extra if name not in INSERT_ONLY]
+    ]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(rows))} "
+        f"ON CONFLICT ({quote(meta.pk.column)}) DO UPDATE SET {', '.join(assignments)} WHERE {changed} "
+        f"RETURNING {table}.{quote(meta.pk.column)}"
+    )
+
+
+def upsert_rows(model, fields, records):
+    """Insert ``records`` (field dicts) or update the rows they already exist as.
+
+    Returns the primary keys of the rows inserted or changed.
+    """
+    records = skip_unique_clashes(model, fields, records)
+    if not records:
+        return []
+    meta = model._meta
+    concrete = {field.name for field in meta.concrete_fields}
+    now = timezone.now()
+    defaults = {'created_at': now, 'updated_at': now, 'is_active': True}
+    extra = [name for name in defaults if name in concrete]
+    prepared = [
+        [meta.get_field(name).get_db_prep_save(record[name], connection) for name in fields]
+        + [meta.get_field(name).get_db_prep_save(defaults[name], connection) for name in extra]
+        for record in records
+    ]
+    columns = [meta.get_field(name) for name in list(fields) + extra]
+    batch_size = max(1, connection.ops.bulk_batch_size(columns, records))
+    written = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(prepared), batch_size):
+            rows = prepared[start:start + batch_size]
+            cursor.execute(upsert_sql(model, fields, rows), [value for row in rows for value in row])
+            written.extend(pk for pk, in cursor.fetchall())
+    return written
+
+
+def announce_written(model, pks):
+    """Send ``batch_saved`` for rows written with raw SQL, which post_save never sees.
+
+    Receivers queue the rows for the recommendation index and retire their
+    cached details. Only the primary key of each instance is set.
+    """
+    if pks:
+        batch_saved.send(sender=model, instances=[model(pk=pk) for pk in pks], created=False)
@@ -0,0 +1,122 @@
+"""Background computation of users' recommendations.
+
+Adding a favorite only stores it; the recommendations for the new favorite
+are computed afterwards and saved as the user's ``UserRecommendation``. A
+user's result is stale while they have a favorite newer than the one it was
+computed from, so queuing a job needs no write of its own.
+
+With ``RECOMMENDATION_JOBS_IN_PROCESS`` (the default) each web worker
+computes its own users' jobs on a background thread. Otherwise run
+``manage.py computerecommendations --loop``, which finds stale users in the
+database.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Max, Q
+
+from apis.models import Favorite, User, UserRecommendation
+
+logger = logging.getLogger(__name__)
+
+# How often a long-polling request re-reads the result
+POLL_INTERVAL = 0.25
+
+
+def compute_recommendations(user_id):
+    """Bring ``user_id``'s recommendations up to date; returns the result, or ``None`` without favorites."""
+    from apis.views import FavoriteBooksAPIViewSet
+
+    favorite = Favorite.objects.filter(user_id=user_id).select_related('book').order_by('-added_at').first()
+    if favorite is None:
+        return None
+    current = UserRecommendation.objects.filter(user_id=user_id).first()
+    if current is not None and current.favorite_added_at >= favorite.added_at:
+        return current
+
+    books = FavoriteBooksAPIViewSet().get_recommendations(favorite.book)
+    result, _ = UserRecommendation.objects.update_or_create(user_id=user_id, defaults={
+        'book_id': favorite.book_id,
+        'book_ids': [book.id for book in books],
+        'favorite_added_at': favorite.added_at,
+    })
+    return result
+
+
+def stale_user_ids(limit=None):
+    """Users with a favorite added after their recommendations were computed, oldest first."""
+    user_ids = (
+        User.objects.annotate(latest=Max('favorites__added_at'))
+        .filter(latest__isnull=False)
+        .filter(Q(recommendation__isnull=True) | Q(recommendation__favorite_added_at__lt=F('latest')))
+        .order_by('latest')
+        .values_list('id', flat=True)
+    )
+    return list(user_ids[:limit] if limit else user_ids)
+
+
+def recommendation_state(user_id):
+    """``(result, pending)`` for ``user_id``; ``pending`` is true while a newer favorite awaits its job."""
+    latest = Favorite.objects.filter(user_id=user_id).aggregate(latest=Max('added_at'))['latest']
+    result = UserRecommendation.objects.filter(user_id=user_id).first()
+    pending = latest is not None and (result is None or result.favorite_added_at < latest)
+    return result, pending
+
+
+def wait_for_recommendations(user_id, timeout):
+    """``recommendation_state()``, polling for up to ``timeout`` seconds while it is pending."""
+    deadline = time.monotonic() + timeout
+    result, pending = recommendation_state(user_id)
+    while pending and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result, pending = recommendation_state(user_id)
+    return result, pending
+
+
+class RecommendationWorker:
+    """A daemon thread computing queued users' recommendations, one at a time.
+
+    A user queued again before their job starts is computed once.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.queued = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, user_id):
+        with self.lock:
+            if user_id in self.queued:
+                return
+            self.queued.add(user_id)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='recommendations', daemon=True)
+                self.thread.start()
+        self.queue.put(user_id)
+
+    def run(self):
+        while True:
+            user_id = self.queue.get()
+            with self.lock:
+                self.queued.discard(user_id)
+            close_old_connections()
+            try:
+                compute_recommendations(user_id)
+            except Exception:
+                logger.exception("Computing recommendations for user %s failed", user_id)
+            finally:
+                close_old_connections()
+
+
+worker = RecommendationWorker()
+
+
+def queue_recommendations(user_id):
+    """Schedule ``user_id``'s recommendations once the current transaction commits."""
+    if getattr(settings, 'RECOMMENDATION_JOBS_IN_PROCESS', True):
+        transaction.on_commit(lambda: worker.submit(user_id))
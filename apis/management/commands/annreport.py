@@ -0,0 +1,75 @@
+import json
+import time
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.ann import ENGINES, build_engine
+from apis.recommender import blocked_top_k, get_index
+
+
+class Command(BaseCommand):
+    help = 'Report recall@k against exact search and query latency for each recommendation engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES),
+                            help='Engines to compare')
+        parser.add_argument('--k', type=int, default=10, help='Neighbors per query')
+        parser.add_argument('--queries', type=int, default=1000, help='Catalog rows sampled as queries')
+        parser.add_argument('--options', type=json.loads, default={},
+                            help='JSON engine options, e.g. \'{"nprobe": 32, "ef_search": 128}\'')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **kwargs):
+        index = get_index()
+        if index is None:
+            raise CommandError('No recommendation index found; run buildrecindex first.')
+
+        k = kwargs['k']
+        matrix = index.matrix
+        rng = np.random.default_rng(kwargs['seed'])
+        query_rows = rng.choice(len(matrix), size=min(kwargs['queries'], len(matrix)), replace=False)
+        queries = np.asarray(matrix[np.sort(query_rows)], dtype=np.float32)
+        truth, _ = blocked_top_k(queries, matrix, k)
+
+        report = []
+        for name in kwargs['engines']:
+            started = time.perf_counter()
+            try:
+                engine = build_engine(name, matrix, **kwargs['options'])
+            except ImproperlyConfigured as e:
+                self.stderr.write(self.style.WARNING(f"Skipping {name}: {e}"))
+                continue
+            build_seconds = time.perf_counter() - started
+
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                rows, _ = engine.search(query[np.newaxis, :], k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(rows[0][rows[0] >= 0]) & set(expected[expected >= 0]))
+
+            report.append({
+                'engine': name,
+                'recall_at_k': hits / max(1, int((truth >= 0).sum())),
+                'build_seconds': build_seconds,
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+            })
+
+        if kwargs['json']:
+            self.stdout.write(json.dumps({'rows': len(matrix), 'dims': matrix.shape[1], 'k': k,
+                                          'queries': len(queries), 'engines': report}, indent=2))
+            return
+
+        self.stdout.write(f"{len(matrix)} books x {matrix.shape[1]} dims, {len(queries)} queries, k={k}")
+        self.stdout.write(f"{'engine':<8}{'recall@k':>10}{'build s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for row in report:
+            self.stdout.write(
+                f"{row['engine']:<8}{row['recall_at_k']:>10.3f}{row['build_seconds']:>10.2f}"
+                f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}"
+            )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apis.search import backfill_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute full-text search vectors (or the SQLite FTS5 table) for existing books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Books updated per statement')
+
+    def handle(self, *args, **kwargs):
+        done = 0
+        for done in backfill_search_vectors(batch_size=kwargs['batch_size']):
+            self.stdout.write(f"Indexed {done} books")
+        self.stdout.write(self.style.SUCCESS(f'Search vectors backfilled for {done} books'))
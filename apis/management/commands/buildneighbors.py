@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.neighbors import score_neighbors
+from apis.recommender import get_index
+
+
+class Command(BaseCommand):
+    help = 'Precompute the top-K most similar books for every book from the recommendation index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=20, help='Neighbors stored per book')
+        parser.add_argument('--query-block', type=int, default=512, help='Books scored per batch')
+        parser.add_argument('--block-size', type=int, default=8192,
+                            help='Catalog rows compared per matrix chunk')
+
+    def handle(self, *args, **kwargs):
+        index = get_index()
+        if index is None:
+            raise CommandError('No recommendation index found; run buildrecindex first.')
+
+        book_ids, matrix = index.live_items()
+        query_block = kwargs['query_block']
+        written = 0
+        for start in range(0, len(book_ids), query_block):
+            query_rows = range(start, min(start + query_block, len(book_ids)))
+            written += score_neighbors(book_ids, matrix, query_rows, kwargs['k'], block_size=kwargs['block_size'])
+            self.stdout.write(f"Scored {query_rows.stop}/{len(book_ids)} books")
+
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} neighbors for {len(book_ids)} books'))
@@ -0,0 +1,56 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from apis.models import Book, BookIndexChange
+from apis.recommender import book_text, index_root, reduce_dimensions, write_index
+
+
+class Command(BaseCommand):
+    help = 'Fit the TF-IDF vectorizer and build the recommendation index offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, default=None,
+                            help='Index root directory (defaults to settings.RECOMMENDATION_INDEX_DIR)')
+        parser.add_argument('--max-features', type=int, default=50000, help='Vocabulary size')
+        parser.add_argument('--min-df', type=int, default=2, help='Ignore terms found in fewer books')
+        parser.add_argument('--dims', type=int, default=256,
+                            help='Reduce vectors to this many dimensions with truncated SVD (0 to keep TF-IDF)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **kwargs):
+        # Changes queued before the catalog is read are already reflected in this build.
+        last_change_id = BookIndexChange.objects.aggregate(last=Max('id'))['last'] or 0
+        book_ids = []
+
+        def documents():
+            rows = Book.objects.order_by('id').values_list('id', 'title', 'description')
+            for book_id, title, description in rows.iterator(chunk_size=kwargs['chunk_size']):
+                book_ids.append(book_id)
+                yield book_text(title, description)
+
+        vectorizer = TfidfVectorizer(
+            stop_words='english',
+            max_features=kwargs['max_features'],
+            min_df=kwargs['min_df'],
+            dtype=np.float32,
+        )
+        try:
+            tfidf = vectorizer.fit_transform(documents())
+        except ValueError as e:
+            raise CommandError(f"Cannot build the recommendation index: {e}")
+        self.stdout.write(f"Vectorized {len(book_ids)} books over {len(vectorizer.vocabulary_)} terms")
+
+        matrix, components = reduce_dimensions(tfidf, kwargs['dims'])
+        path = write_index(
+            matrix.astype(np.float32),
+            book_ids,
+            vectorizer.vocabulary_,
+            vectorizer.idf_,
+            components=components,
+            root=kwargs['output'] or index_root(),
+            stop_words='english',
+            last_change_id=last_change_id,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Recommendation index written to {path}'))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apis.models import BookIndexChange, BookNeighbor
+from apis.neighbors import score_neighbors
+from apis.recommender import RecommendationIndex, current_version_path, prune_versions, write_index
+
+
+class Command(BaseCommand):
+    help = 'Fold queued catalog changes into a new recommendation index version and re-score their neighbors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=20, help='Neighbors stored per book')
+        parser.add_argument('--query-block', type=int, default=512, help='Books re-scored per batch')
+        parser.add_argument('--block-size', type=int, default=8192,
+                            help='Catalog rows compared per matrix chunk')
+        parser.add_argument('--keep', type=int, default=2, help='Index versions kept on disk')
+
+    def handle(self, *args, **kwargs):
+        path = current_version_path()
+        if path is None:
+            raise CommandError('No recommendation index found; run buildrecindex first.')
+
+        index = RecommendationIndex(path)
+        first_change_id = index.last_change_id
+        changed = index.refresh()
+        last_change_id = index.last_change_id
+        rescore = set(changed) | set(
+            BookIndexChange.objects.filter(
+                id__gt=first_change_id, id__lte=last_change_id, action=BookIndexChange.RESCORE
+            ).values_list('book_id', flat=True)
+        )
+        if not rescore:
+            self.stdout.write('No queued changes to compact.')
+            return
+
+        compacted = index
+        if changed:
+            meta = {key: value for key, value in index.meta.items() if key not in ('format', 'rows', 'dims')}
+            meta['last_change_id'] = last_change_id
+            book_ids, matrix = index.live_items()
+            path = write_index(matrix, book_ids, index.vocabulary, index.idf, index.components,
+                               root=path.parent, **meta)
+            self.stdout.write(f"Wrote {path} with {len(book_ids)} books ({len(changed)} changed)")
+            compacted = RecommendationIndex(path)
+
+        scored = self._rescore(compacted, rescore, **kwargs)
+        # A changed book is most likely to enter the lists of its own nearest neighbors.
+        neighbor_ids = set(
+            BookNeighbor.objects.filter(book_id__in=changed).values_list('neighbor_id', flat=True)
+        )
+        scored += self._rescore(compacted, neighbor_ids - rescore, **kwargs)
+
+        BookIndexChange.objects.filter(id__lte=last_change_id).delete()
+        prune_versions(path.parent, keep=kwargs['keep'])
+        self.stdout.write(self.style.SUCCESS(f'Re-scored neighbors of {scored} books'))
+
+    def _rescore(self, index, book_ids, k, query_block, block_size, **kwargs):
+        rows = sorted(index.rows[book_id] for book_id in book_ids if book_id in index.rows)
+        for start in range(0, len(rows), query_block):
+            score_neighbors(index.book_ids, index.matrix, rows[start:start + query_block], k, block_size=block_size)
+        return len(rows)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apis.jobs import compute_recommendations, stale_user_ids
+
+
+class Command(BaseCommand):
+    help = "Compute recommendations for users who added a favorite since theirs were last computed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new favorites')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --loop')
+        parser.add_argument('--limit', type=int, default=100, help='Users computed per poll')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            user_ids = stale_user_ids(kwargs['limit'])
+            for user_id in user_ids:
+                compute_recommendations(user_id)
+            if user_ids:
+                self.stdout.write(f"Computed recommendations for {len(user_ids)} users")
+            if not kwargs['loop']:
+                break
+            if len(user_ids) < kwargs['limit']:
+                time.sleep(kwargs['interval'])
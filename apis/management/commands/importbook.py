@@ -1,106 +1,194 @@
 import json
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from apis.models import Author, Book
-from datetime import datetime
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from apis.ingest.checkpoint import Checkpoint, CheckpointError
+from apis.ingest.copy import CopyLoader, LinkCopyLoader, merge_all, staging_key
+from apis.ingest.features import FeatureSpool, HashedFeatures, build_hashed_index
+from apis.ingest.links import link_book_authors
+from apis.ingest.parallel import line_ranges, read_batches
+from apis.ingest.progress import Progress
+from apis.ingest.records import BOOK_FIELDS, parse_book
+from apis.ingest.stats import ImportStats, TimedParser
+from apis.ingest.upsert import announce_written, upsert_rows
+from apis.models import Book, BookIndexChange
 
 
 class Command(BaseCommand):
     help = 'Import data from books.json'
 
     def add_arguments(self, parser):
-        parser.add_argument('file_path', type=str, help='The path to the JSON file to be imported')
+        parser.add_argument('file_path', type=str,
+                            help='The path to the JSON file to be imported (.gz, .bz2 and .zst are read as they are)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Parse the file in this many processes (the database writer stays single)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records written per batch')
+        parser.add_argument('--copy', action='store_true',
+                            help='PostgreSQL only: COPY rows into staging tables and merge them once at the end')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue an interrupted import from its checkpoint file')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update books that already exist instead of skipping them')
+        parser.add_argument('--build-index', action='store_true',
+                            help='Hash TF-IDF features while parsing and write a recommendation index at the end '
+                                 '(only into an empty catalog: the index holds the imported books alone)')
+        parser.add_argument('--dims', type=int, default=256,
+                            help='With --build-index: reduce vectors to this many dimensions (0 to keep TF-IDF)')
+        parser.add_argument('--min-df', type=int, default=2,
+                            help='With --build-index: ignore terms found in fewer books')
+        parser.add_argument('--report', type=str, default=None,
+                            help='Also write the per-stage timing report to this JSON file')
+        parser.add_argument('--profile', type=str, default=None,
+                            help='Write a cProfile dump of the slowest batch to this file')
 
     def handle(self, *args, **kwargs):
         file_path = kwargs['file_path']
-        batch_size = 1000  # Process 1000 records per batch
-        batch = []
-        author_ids = set()
-        book_authors = []
-
-        with open(file_path, 'r') as file:
+        upsert = kwargs['upsert']
+        mode = 'copy' if kwargs['copy'] else None
+        if kwargs['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy needs a PostgreSQL database')
+
+        if not os.path.isfile(file_path):
+            raise CommandError(f'No such file: {file_path}')
+
+        if kwargs['build_index']:
+            # The index is built from this file alone and would drop every other book from recommendations.
+            if kwargs['resume'] and not FeatureSpool(file_path).exists():
+                raise CommandError('The interrupted import spooled no features: resume it without --build-index '
+                                   'and run buildrecindex afterwards')
+            if not kwargs['resume'] and Book.objects.exists():
+                raise CommandError('--build-index needs an empty catalog: import without it and run buildrecindex '
+                                   'afterwards')
+
+        if kwargs['resume']:
             try:
-                for line in file:
-                    item = json.loads(line.strip())
-
-                    # Extract data from the JSON object
-                    book_id = item.get('id')
-                    title = item.get('title')
-                    authors_data = item.get('authors', [])
-                    published_date = item.get('publication_date', '')
-                    isbn = item.get('isbn13', '') or item.get('isbn', '')
-                    description = item.get('description', '')
-
-                    # Collect author IDs
-                    for author_data in authors_data:
-                        author_id = author_data.get('id')
-                        if author_id:
-                            author_ids.add(author_id)
-                            book_authors.append((book_id, author_id))
-
-                    # Add book to the batch
-                    batch.append(
-                        Book(
-                            id=book_id,
-                            title=title,
-                            published_date=self.parse_date(published_date),
-                            isbn=isbn,
-                            description=description
-                        )
-                    )
-
-                    # Process the batch if it's full
-                    if len(batch) >= batch_size:
-                        self._process_batch(batch, author_ids, book_authors)
-                        batch = []  # Clear batch list for the next set
-                        author_ids.clear()  # Clear author IDs for the next set
-                        book_authors.clear()  # Clear author mapping for the next set
-
-                # Process any remaining records in the batch
-                if batch:
-                    self._process_batch(batch, author_ids, book_authors)
-
-            except json.JSONDecodeError as e:
-                self.stderr.write(self.style.ERROR(f"Failed to decode JSON object: {e}"))
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
-
+                checkpoint = Checkpoint.load(file_path, mode)
+            except CheckpointError as e:
+                raise CommandError(e)
+            self.stdout.write(f'Resuming after {checkpoint.batches} committed batches')
+        else:
+            checkpoint = Checkpoint(file_path, line_ranges(file_path, kwargs['workers']), mode=mode)
+
+        loaders = None
+        if kwargs['copy']:
+            key = staging_key(file_path)
+            loaders = [CopyLoader(Book, BOOK_FIELDS, key), LinkCopyLoader(Book.authors, key)]
+            for loader in loaders:
+                loader.prepare(resume=kwargs['resume'])
+
+        spool = None
+        if kwargs['build_index']:
+            # Changes queued before the import starts are already reflected in the index it builds.
+            last_change_id = BookIndexChange.objects.aggregate(last=Max('id'))['last'] or 0
+            spool = FeatureSpool(file_path)
+            spool.prepare(resume=kwargs['resume'])
+
+        self.stats = stats = ImportStats(inline_parsing=kwargs['workers'] <= 1, profile_path=kwargs['profile'])
+        failed_parts = set()
+        error = None
+        try:
+            with connection.execute_wrapper(stats):
+                ranges = checkpoint.remaining()
+                parser = TimedParser(parse_book, then=HashedFeatures() if spool else None, dates=True)
+                batches = read_batches(file_path, parser, kwargs['batch_size'], workers=kwargs['workers'],
+                                       ranges=ranges, finish=parser.finish)
+                progress = Progress(ranges, self.stdout.write)
+                for part, offset, (records, timings) in stats.track(batches):
+                    if spool:
+                        records, counts = records
+                    stats.add_parsed(timings, len(records))
+                    progress.update(part, offset, len(records))
+                    if loaders:
+                        with stats.stage('copy', len(records)):
+                            self._stage_batch(loaders, records)
+                        stored = True
+                    else:
+                        batch = []
+                        book_authors = []
+                        for fields, author_ids in records:
+                            batch.append(fields)
+                            book_authors.extend((fields['id'], author_id) for author_id in author_ids)
+                        stored = self._process_batch(batch, book_authors, upsert)
+
+                    # A failed batch pins its range's checkpoint so --resume retries it
+                    if not stored:
+                        failed_parts.add(part)
+                        continue
+                    if spool:
+                        with stats.stage('spool', len(records)):
+                            spool.add(part, offset, [fields['id'] for fields, _ in records], counts)
+                    if part not in failed_parts:
+                        with stats.stage('checkpoint'):
+                            checkpoint.advance(part, offset)
+
+                progress.report()
+                if loaders:
+                    with stats.stage('merge'):
+                        books, links = merge_all(loaders, upsert)
+                    if upsert:
+                        announce_written(Book, books)
+                    self.stdout.write(f'Merged {len(books)} books and {links} author links')
+                if not failed_parts:
+                    if spool:
+                        with stats.stage('index'):
+                            self._build_index(spool, kwargs['dims'], kwargs['min_df'], last_change_id, upsert)
+                    checkpoint.clear()
+
+        except json.JSONDecodeError as e:
+            error = f"Failed to decode JSON object: {e}"
+        except Exception as e:
+            error = f"An error occurred: {e}"
+
+        stats.finish()
+        for line in stats.table():
+            self.stdout.write(line)
+        if kwargs['report']:
+            stats.write(kwargs['report'], command='importbook', file=file_path)
+        # The timings above are still worth having; the exit status must tell the import did not finish
+        if error:
+            raise CommandError(error)
+        if failed_parts:
+            raise CommandError('Some batches failed to import: run the command again with --resume to retry them')
         self.stdout.write(self.style.SUCCESS(f'Data imported successfully from {file_path}'))
 
-    def _process_batch(self, batch, author_ids, book_authors):
+    def _build_index(self, spool, dims, min_df, last_change_id, upsert):
+        # Without --upsert the first row for an id is the one stored
+        book_ids, counts = spool.load(first_wins=not upsert)
+        # Rows skipped on a conflict were never stored; the catalog started empty, so it holds only this import
+        stored = set(Book.objects.values_list('id', flat=True).iterator())
+        rows = [row for row, book_id in enumerate(book_ids) if book_id in stored]
+        book_ids, counts = [book_ids[row] for row in rows], counts[rows]
+        if not book_ids:
+            return
+        path = build_hashed_index(book_ids, counts, dims, min_df=min_df, last_change_id=last_change_id)
+        spool.clear()
+        self.stdout.write(f'Recommendation index for {len(book_ids)} books written to {path}')
+
+    def _stage_batch(self, loaders, records):
+        book_loader, link_loader = loaders
+        book_loader.stage(fields for fields, _ in records)
+        link_loader.stage(
+            (fields['id'], author_id) for fields, author_ids in records for author_id in author_ids
+        )
+
+    def _process_batch(self, batch, book_authors, upsert=False):
         try:
-            with transaction.atomic():
-                # Create or update books in bulk
-                Book.objects.bulk_create(batch, ignore_conflicts=True)
-
-                # Fetch all authors
-                authors = Author.objects.filter(id__in=author_ids).values_list('id', flat=True)
-                author_dict = {author_id: Author.objects.get(pk=author_id) for author_id in authors}
-
-                # Update authors for books
-                for book_id, author_id in book_authors:
-                    if author_id in author_dict:
-                        book = Book.objects.get(pk=book_id)
-                        book.authors.add(author_dict[author_id])
-                        book.save()
+            with self.stats.stage('write', len(batch)), transaction.atomic():
+                if upsert:
+                    # Insert new books and refresh the fields of changed ones; queue those for the index
+                    announce_written(Book, upsert_rows(Book, BOOK_FIELDS, batch))
+                else:
+                    # Create books in bulk, skipping existing ones
+                    with self.stats.stage('build', len(batch)):
+                        books = [Book(**fields) for fields in batch]
+                    Book.objects.bulk_create(books, ignore_conflicts=True)
+
+                # Link the batch's books to known authors in one bulk insert
+                with self.stats.stage('link', len(book_authors)):
+                    link_book_authors(book_authors)
 
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to process batch: {e}"))
-
-    def parse_date(self, date_str):
-        """Parse date string to a date object. Returns None if parsing fails."""
-        formats = ['%Y-%m-%d', '%Y-%m', '%Y']
-        for fmt in formats:
-            try:
-                if date_str:
-                    # If the date format is YYYY-MM, set day to 01
-                    if fmt == '%Y-%m' and len(date_str) == 7:
-                        return datetime.strptime(date_str + '-01', fmt + '-%d').date()
-                    # If the date format is YYYY, set month and day to 01
-                    elif fmt == '%Y' and len(date_str) == 4:
-                        return datetime.strptime(date_str + '-01-01', fmt + '-%m-%d').date()
-                    else:
-                        return datetime.strptime(date_str, fmt).date()
-            except ValueError:
-                continue
-        return None
+            return False
+        return True
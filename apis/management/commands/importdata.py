@@ -1,80 +1,128 @@
 import json
+import os
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from apis.ingest.checkpoint import Checkpoint, CheckpointError
+from apis.ingest.copy import CopyLoader, merge_all, staging_key
+from apis.ingest.parallel import line_ranges, read_batches
+from apis.ingest.progress import Progress
+from apis.ingest.records import AUTHOR_FIELDS, parse_author
+from apis.ingest.stats import ImportStats, TimedParser
+from apis.ingest.upsert import announce_written, upsert_rows
 from apis.models import Author
-from django.db import transaction
+from django.db import connection, transaction
 
 
 class Command(BaseCommand):
     help = 'Import data from authors.json'
 
     def add_arguments(self, parser):
-        parser.add_argument('file_path', type=str, help='The path to the JSON file to be imported')
+        parser.add_argument('file_path', type=str,
+                            help='The path to the JSON file to be imported (.gz, .bz2 and .zst are read as they are)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Parse the file in this many processes (the database writer stays single)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records written per batch')
+        parser.add_argument('--copy', action='store_true',
+                            help='PostgreSQL only: COPY rows into a staging table and merge it once at the end')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue an interrupted import from its checkpoint file')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update authors that already exist instead of skipping them')
+        parser.add_argument('--report', type=str, default=None,
+                            help='Also write the per-stage timing report to this JSON file')
+        parser.add_argument('--profile', type=str, default=None,
+                            help='Write a cProfile dump of the slowest batch to this file')
 
     def handle(self, *args, **kwargs):
         file_path = kwargs['file_path']
+        upsert = kwargs['upsert']
+        mode = 'copy' if kwargs['copy'] else None
+        if kwargs['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy needs a PostgreSQL database')
 
-        # Initialize a list to batch process
-        batch_size = 1000  # Adjust batch size as needed
-        batch = []
+        if not os.path.isfile(file_path):
+            raise CommandError(f'No such file: {file_path}')
 
-        with open(file_path, 'r') as file:
+        if kwargs['resume']:
             try:
-                for line in file:
-                    # Load each line as a separate JSON object
-                    item = json.loads(line.strip())
+                checkpoint = Checkpoint.load(file_path, mode)
+            except CheckpointError as e:
+                raise CommandError(e)
+            self.stdout.write(f'Resuming after {checkpoint.batches} committed batches')
+        else:
+            checkpoint = Checkpoint(file_path, line_ranges(file_path, kwargs['workers']), mode=mode)
 
-                    # Extract data from the JSON object
-                    author_id = item.get('id')
-                    name = item.get('name')
-                    gender = item.get('gender', '')
-                    image_url = item.get('image_url', '')
-                    about = item.get('about', '')
-                    ratings_count = item.get('ratings_count', 0)
-                    average_rating = item.get('average_rating', 0.0)
-                    text_reviews_count = item.get('text_reviews_count', 0)
-                    work_ids = item.get('work_ids', [])
-                    book_ids = item.get('book_ids', [])
-                    works_count = item.get('works_count', 0)
-                    fans_count = item.get('fans_count', 0)
+        loader = None
+        if kwargs['copy']:
+            loader = CopyLoader(Author, AUTHOR_FIELDS, staging_key(file_path))
+            loader.prepare(resume=kwargs['resume'])
 
-                    # Append to batch list
-                    batch.append(
-                        Author(
-                            id=author_id,
-                            name=name,
-                            gender=gender,
-                            image_url=image_url,
-                            about=about,
-                            ratings_count=ratings_count,
-                            average_rating=average_rating,
-                            text_reviews_count=text_reviews_count,
-                            work_ids=work_ids,
-                            book_ids=book_ids,
-                            works_count=works_count,
-                            fans_count=fans_count
-                        )
-                    )
+        self.stats = stats = ImportStats(inline_parsing=kwargs['workers'] <= 1, profile_path=kwargs['profile'])
+        failed_parts = set()
+        error = None
+        try:
+            with connection.execute_wrapper(stats):
+                ranges = checkpoint.remaining()
+                parser = TimedParser(parse_author)
+                batches = read_batches(file_path, parser, kwargs['batch_size'], workers=kwargs['workers'],
+                                       ranges=ranges, finish=parser.finish)
+                progress = Progress(ranges, self.stdout.write)
+                for part, offset, (records, timings) in stats.track(batches):
+                    stats.add_parsed(timings, len(records))
+                    progress.update(part, offset, len(records))
+                    if loader:
+                        with stats.stage('copy', len(records)):
+                            loader.stage(records)
+                        stored = True
+                    else:
+                        stored = self._process_batch(records, upsert)
 
-                    # Process the batch if it's full
-                    if len(batch) >= batch_size:
-                        self._process_batch(batch)
-                        batch = []  # Clear batch list for the next set
+                    # A failed batch pins its range's checkpoint so --resume retries it
+                    if not stored:
+                        failed_parts.add(part)
+                    elif part not in failed_parts:
+                        with stats.stage('checkpoint'):
+                            checkpoint.advance(part, offset)
 
-                # Process any remaining records in the batch
-                if batch:
-                    self._process_batch(batch)
+                progress.report()
+                if loader:
+                    with stats.stage('merge'):
+                        authors, = merge_all([loader], upsert)
+                    if upsert:
+                        announce_written(Author, authors)
+                    self.stdout.write(f'Merged {len(authors)} authors')
+                if not failed_parts:
+                    checkpoint.clear()
 
-            except json.JSONDecodeError as e:
-                self.stderr.write(self.style.ERROR(f"Failed to decode JSON object: {e}"))
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"An error occurred: {e}"))
+        except json.JSONDecodeError as e:
+            error = f"Failed to decode JSON object: {e}"
+        except Exception as e:
+            error = f"An error occurred: {e}"
 
+        stats.finish()
+        for line in stats.table():
+            self.stdout.write(line)
+        if kwargs['report']:
+            stats.write(kwargs['report'], command='importdata', file=file_path)
+        # The timings above are still worth having; the exit status must tell the import did not finish
+        if error:
+            raise CommandError(error)
+        if failed_parts:
+            raise CommandError('Some batches failed to import: run the command again with --resume to retry them')
         self.stdout.write(self.style.SUCCESS(f'Data imported successfully from {file_path}'))
 
-    def _process_batch(self, batch):
+    def _process_batch(self, batch, upsert=False):
         try:
-            with transaction.atomic():  # Ensure the operation is atomic
-                Author.objects.bulk_create(batch, ignore_conflicts=True)  # Use bulk_create to optimize database writes
+            with self.stats.stage('write', len(batch)), transaction.atomic():  # Ensure the operation is atomic
+                if upsert:
+                    # Insert new authors, refresh changed ones and retire their cached details
+                    announce_written(Author, upsert_rows(Author, AUTHOR_FIELDS, batch))
+                else:
+                    with self.stats.stage('build', len(batch)):
+                        authors = [Author(**fields) for fields in batch]
+                    # Use bulk_create to optimize database writes
+                    Author.objects.bulk_create(authors, ignore_conflicts=True)
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to process batch: {e}"))
+            return False
+        return True
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apis.ingest.links import author_book_pairs, link_book_authors, unlink_book_authors
+from apis.ingest.parallel import read_batches
+from apis.ingest.records import parse_book_line
+
+
+class Command(BaseCommand):
+    help = 'Link books to authors in bulk from Author.book_ids, or from the authors listed in a books.json file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=str, default=None,
+                            help='Link from the book side, reading author ids from this books.json file')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Replace the existing links of every author (or book) read instead of adding to them')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Links resolved and written per chunk')
+        parser.add_argument('--workers', type=int, default=1, help='With --books: parse the file in this many processes')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['books']:
+            side, chunks = 'book', self._book_chunks(kwargs['books'], kwargs['chunk_size'], kwargs['workers'])
+        else:
+            side, chunks = 'author', author_book_pairs(kwargs['chunk_size'])
+
+        linked = unlinked = 0
+        for ids, pairs in chunks:
+            # Each chunk is swapped atomically, so a rerun or an interrupted rebuild is always consistent.
+            with transaction.atomic():
+                if kwargs['rebuild']:
+                    unlinked += unlink_book_authors(side, ids)
+                linked += link_book_authors(pairs)
+            self.stdout.write(f'Linked {linked} book authors')
+
+        if kwargs['rebuild']:
+            self.stdout.write(f'Removed {unlinked} previous links')
+        self.stdout.write(self.style.SUCCESS(f'Book authors linked from the {side} side'))
+
+    def _book_chunks(self, file_path, chunk_size, workers):
+        for part, offset, records in read_batches(file_path, parse_book_line, chunk_size, workers=workers):
+            book_ids = [fields['id'] for fields, _ in records]
+            pairs = [(fields['id'], author_id) for fields, author_ids in records for author_id in author_ids]
+            yield book_ids, pairs
@@ -0,0 +1,14 @@
+# Generated by Django 3.2 on 2026-10-18 17:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0005_auto_20240815_0801'),
+        ('apis', '0006_alter_book_published_date'),
+    ]
+
+    operations = [
+    ]
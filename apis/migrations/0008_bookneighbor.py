@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0007_merge_20261018_1743'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='apis.book')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='apis.book')),
+            ],
+            options={
+                'ordering': ['book', 'rank'],
+                'unique_together': {('book', 'rank')},
+            },
+        ),
+    ]
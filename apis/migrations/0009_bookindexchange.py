@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0008_bookneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookIndexChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.CharField(max_length=500)),
+                ('action', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete'), ('rescore', 'Rescore')], max_length=10)),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 3.2 on 2026-10-18 17:49
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+GIN_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['tsv_description'], name='book_tsv_description_gin'),
+    django.contrib.postgres.indexes.GinIndex(fields=['tsv_title'], name='book_tsv_title_gin'),
+]
+
+POSTGRES_TRIGGER = """
+CREATE OR REPLACE FUNCTION apis_book_tsv_update() RETURNS trigger AS $$
+BEGIN
+    NEW.tsv_title := to_tsvector('pg_catalog.english', coalesce(NEW.title, ''));
+    NEW.tsv_description := to_tsvector('pg_catalog.english', coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER apis_book_tsv_update
+    BEFORE INSERT OR UPDATE OF title, description ON apis_book
+    FOR EACH ROW EXECUTE PROCEDURE apis_book_tsv_update();
+"""
+
+POSTGRES_TRIGGER_DROP = """
+DROP TRIGGER IF EXISTS apis_book_tsv_update ON apis_book;
+DROP FUNCTION IF EXISTS apis_book_tsv_update();
+"""
+
+# External-content FTS5 table over apis_book, kept in sync by triggers.
+SQLITE_FTS = """
+CREATE VIRTUAL TABLE apis_book_fts USING fts5(
+    title, description, content='apis_book', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER apis_book_fts_insert AFTER INSERT ON apis_book BEGIN
+    INSERT INTO apis_book_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER apis_book_fts_delete AFTER DELETE ON apis_book BEGIN
+    INSERT INTO apis_book_fts(apis_book_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER apis_book_fts_update AFTER UPDATE OF title, description ON apis_book BEGIN
+    INSERT INTO apis_book_fts(apis_book_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO apis_book_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+INSERT INTO apis_book_fts(apis_book_fts) VALUES ('rebuild');
+"""
+
+SQLITE_FTS_DROP = """
+DROP TRIGGER IF EXISTS apis_book_fts_insert;
+DROP TRIGGER IF EXISTS apis_book_fts_delete;
+DROP TRIGGER IF EXISTS apis_book_fts_update;
+DROP TABLE IF EXISTS apis_book_fts;
+"""
+
+
+def clear_text_vectors(apps, schema_editor):
+    # The old TextField values are not valid tsvector input; the backfill
+    # command recomputes them after the type change.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('UPDATE apis_book SET tsv_description = NULL, tsv_title = NULL')
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        Book = apps.get_model('apis', 'Book')
+        for index in GIN_INDEXES:
+            schema_editor.add_index(Book, index)
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        Book = apps.get_model('apis', 'Book')
+        for index in GIN_INDEXES:
+            schema_editor.remove_index(Book, index)
+
+
+def create_search_sync(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_TRIGGER)
+    elif schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS)
+
+
+def drop_search_sync(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_TRIGGER_DROP)
+    elif schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0009_bookindexchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_text_vectors, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='book',
+            name='tsv_description',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='tsv_title',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        # GIN is PostgreSQL only; SQLite gets the FTS5 table below instead.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='book', index=index) for index in GIN_INDEXES],
+            database_operations=[migrations.RunPython(create_gin_indexes, drop_gin_indexes)],
+        ),
+        migrations.RunPython(create_search_sync, drop_search_sync),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2 on 2026-10-18 17:50
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ('author', django.contrib.postgres.indexes.GinIndex(fields=['name'], name='author_name_trgm', opclasses=['gin_trgm_ops'])),
+    ('book', django.contrib.postgres.indexes.GinIndex(fields=['title'], name='book_title_trgm', opclasses=['gin_trgm_ops'])),
+]
+
+SQLITE_FTS = """
+CREATE VIRTUAL TABLE apis_author_fts USING fts5(
+    name, content='apis_author', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER apis_author_fts_insert AFTER INSERT ON apis_author BEGIN
+    INSERT INTO apis_author_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+CREATE TRIGGER apis_author_fts_delete AFTER DELETE ON apis_author BEGIN
+    INSERT INTO apis_author_fts(apis_author_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+END;
+CREATE TRIGGER apis_author_fts_update AFTER UPDATE OF name ON apis_author BEGIN
+    INSERT INTO apis_author_fts(apis_author_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    INSERT INTO apis_author_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+INSERT INTO apis_author_fts(apis_author_fts) VALUES ('rebuild');
+"""
+
+SQLITE_FTS_DROP = """
+DROP TRIGGER IF EXISTS apis_author_fts_insert;
+DROP TRIGGER IF EXISTS apis_author_fts_delete;
+DROP TRIGGER IF EXISTS apis_author_fts_update;
+DROP TABLE IF EXISTS apis_author_fts;
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for model_name, index in TRIGRAM_INDEXES:
+            schema_editor.add_index(apps.get_model('apis', model_name), index)
+    elif schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for model_name, index in TRIGRAM_INDEXES:
+            schema_editor.remove_index(apps.get_model('apis', model_name), index)
+    elif schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0010_search_vectors'),
+    ]
+
+    operations = [
+        # pg_trgm and its GIN indexes are PostgreSQL only; SQLite gets an FTS5 table over author names.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in TRIGRAM_INDEXES
+            ],
+            database_operations=[migrations.RunPython(create_search_indexes, drop_search_indexes)],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 18:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0011_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.CharField(max_length=500)),
+                ('book_ids', models.JSONField(default=list)),
+                ('favorite_added_at', models.DateTimeField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
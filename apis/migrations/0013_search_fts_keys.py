@@ -0,0 +1,119 @@
+# Generated by Django 3.2 on 2026-10-18 19:20
+
+from django.db import migrations
+
+# The FTS tables of 0010 and 0011 used the rowid of apis_book and apis_author, which is not stable.
+# Each FTS table is keyed on a *_fts_key table instead and stores its own copy of the text (see apis.fts).
+SQLITE_FTS_DROP = """
+DROP TRIGGER IF EXISTS apis_book_fts_insert;
+DROP TRIGGER IF EXISTS apis_book_fts_delete;
+DROP TRIGGER IF EXISTS apis_book_fts_update;
+DROP TRIGGER IF EXISTS apis_author_fts_insert;
+DROP TRIGGER IF EXISTS apis_author_fts_delete;
+DROP TRIGGER IF EXISTS apis_author_fts_update;
+DROP TABLE IF EXISTS apis_book_fts;
+DROP TABLE IF EXISTS apis_author_fts;
+"""
+
+SQLITE_FTS_KEYED = """
+CREATE TABLE apis_book_fts_key (id INTEGER PRIMARY KEY, book_id varchar(500) NOT NULL UNIQUE);
+CREATE VIRTUAL TABLE apis_book_fts USING fts5(title, description, tokenize='porter unicode61');
+CREATE TABLE apis_author_fts_key (id INTEGER PRIMARY KEY, author_id varchar(500) NOT NULL UNIQUE);
+CREATE VIRTUAL TABLE apis_author_fts USING fts5(name, tokenize='unicode61');
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_insert AFTER INSERT ON apis_book BEGIN
+    INSERT INTO apis_book_fts_key(book_id) VALUES (new.id);
+    INSERT INTO apis_book_fts(rowid, title, description)
+    VALUES ((SELECT id FROM apis_book_fts_key WHERE book_id = new.id), new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_delete AFTER DELETE ON apis_book BEGIN
+    DELETE FROM apis_book_fts WHERE rowid = (SELECT id FROM apis_book_fts_key WHERE book_id = old.id);
+    DELETE FROM apis_book_fts_key WHERE book_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS apis_book_fts_update AFTER UPDATE OF id, title, description ON apis_book BEGIN
+    UPDATE apis_book_fts_key SET book_id = new.id WHERE book_id = old.id;
+    UPDATE apis_book_fts SET title = new.title, description = new.description
+    WHERE rowid = (SELECT id FROM apis_book_fts_key WHERE book_id = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_insert AFTER INSERT ON apis_author BEGIN
+    INSERT INTO apis_author_fts_key(author_id) VALUES (new.id);
+    INSERT INTO apis_author_fts(rowid, name)
+    VALUES ((SELECT id FROM apis_author_fts_key WHERE author_id = new.id), new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_delete AFTER DELETE ON apis_author BEGIN
+    DELETE FROM apis_author_fts WHERE rowid = (SELECT id FROM apis_author_fts_key WHERE author_id = old.id);
+    DELETE FROM apis_author_fts_key WHERE author_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS apis_author_fts_update AFTER UPDATE OF id, name ON apis_author BEGIN
+    UPDATE apis_author_fts_key SET author_id = new.id WHERE author_id = old.id;
+    UPDATE apis_author_fts SET name = new.name
+    WHERE rowid = (SELECT id FROM apis_author_fts_key WHERE author_id = new.id);
+END;
+INSERT INTO apis_book_fts_key(book_id) SELECT id FROM apis_book;
+INSERT INTO apis_book_fts(rowid, title, description)
+SELECT k.id, b.title, b.description FROM apis_book_fts_key k JOIN apis_book b ON b.id = k.book_id;
+INSERT INTO apis_author_fts_key(author_id) SELECT id FROM apis_author;
+INSERT INTO apis_author_fts(rowid, name)
+SELECT k.id, a.name FROM apis_author_fts_key k JOIN apis_author a ON a.id = k.author_id;
+"""
+
+SQLITE_FTS_KEYED_DROP = SQLITE_FTS_DROP + """
+DROP TABLE IF EXISTS apis_book_fts_key;
+DROP TABLE IF EXISTS apis_author_fts_key;
+"""
+
+# The external-content tables of 0010 and 0011, restored when migrating back
+SQLITE_FTS_ROWID = """
+CREATE VIRTUAL TABLE apis_book_fts USING fts5(
+    title, description, content='apis_book', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER apis_book_fts_insert AFTER INSERT ON apis_book BEGIN
+    INSERT INTO apis_book_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER apis_book_fts_delete AFTER DELETE ON apis_book BEGIN
+    INSERT INTO apis_book_fts(apis_book_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER apis_book_fts_update AFTER UPDATE OF title, description ON apis_book BEGIN
+    INSERT INTO apis_book_fts(apis_book_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO apis_book_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+INSERT INTO apis_book_fts(apis_book_fts) VALUES ('rebuild');
+CREATE VIRTUAL TABLE apis_author_fts USING fts5(
+    name, content='apis_author', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER apis_author_fts_insert AFTER INSERT ON apis_author BEGIN
+    INSERT INTO apis_author_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+CREATE TRIGGER apis_author_fts_delete AFTER DELETE ON apis_author BEGIN
+    INSERT INTO apis_author_fts(apis_author_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+END;
+CREATE TRIGGER apis_author_fts_update AFTER UPDATE OF name ON apis_author BEGIN
+    INSERT INTO apis_author_fts(apis_author_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    INSERT INTO apis_author_fts(rowid, name) VALUES (new.rowid, new.name);
+END;
+INSERT INTO apis_author_fts(apis_author_fts) VALUES ('rebuild');
+"""
+
+
+def key_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS_DROP + SQLITE_FTS_KEYED)
+
+
+def unkey_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executescript(SQLITE_FTS_KEYED_DROP + SQLITE_FTS_ROWID)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apis', '0012_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_search_tables, unkey_search_tables),
+    ]
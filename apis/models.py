@@ -1,4 +1,6 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from common.model_mixins import TimestampMixin
@@ -23,6 +25,11 @@ class Author(TimestampMixin):
     works_count = models.IntegerField(default=0)
     fans_count = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['name'], name='author_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -34,13 +41,59 @@ class Book(TimestampMixin):
     published_date = models.DateField(blank=True, null=True)  # Allow null values
     isbn = models.CharField(max_length=130, unique=True)
     description = models.TextField(blank=True, null=True)
-    tsv_description = models.TextField(blank=True, null=True)
-    tsv_title = models.TextField(blank=True, null=True)
+    # Maintained by database triggers on PostgreSQL (see migration 0010); on SQLite
+    # the apis_book_fts FTS5 table serves full-text search instead (apis/search.py).
+    tsv_description = SearchVectorField(blank=True, null=True)
+    tsv_title = SearchVectorField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['tsv_description'], name='book_tsv_description_gin'),
+            GinIndex(fields=['tsv_title'], name='book_tsv_title_gin'),
+            GinIndex(fields=['title'], name='book_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class BookNeighbor(models.Model):
+    """Precomputed top-K most similar books, read back with one indexed query."""
+    book = models.ForeignKey(Book, related_name='neighbors', on_delete=models.CASCADE)
+    neighbor = models.ForeignKey(Book, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('book', 'rank')
+        ordering = ['book', 'rank']
+
+    def __str__(self):
+        return f"{self.book_id} -> {self.neighbor_id} ({self.rank})"
+
+
+class BookIndexChange(models.Model):
+    """Queue of catalog writes not yet folded into the recommendation index."""
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    RESCORE = 'rescore'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+        (RESCORE, 'Rescore'),
+    ]
+
+    book_id = models.CharField(max_length=500)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.action} {self.book_id}"
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(User, related_name='favorites', on_delete=models.CASCADE)
     book = models.ForeignKey(Book, related_name='favorited_by', on_delete=models.CASCADE)
@@ -52,3 +105,19 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
+
+
+class UserRecommendation(models.Model):
+    """A user's latest recommendations, computed in the background after a favorite is added.
+
+    They are based on the user's most recently added favorite; they are stale
+    while a favorite newer than ``favorite_added_at`` exists.
+    """
+    user = models.OneToOneField(User, related_name='recommendation', on_delete=models.CASCADE)
+    book_id = models.CharField(max_length=500)
+    book_ids = models.JSONField(default=list)
+    favorite_added_at = models.DateTimeField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} <- {self.book_id}"
@@ -0,0 +1,31 @@
+"""Maintenance of the precomputed ``BookNeighbor`` table."""
+from django.db import transaction
+
+from apis.models import BookNeighbor
+from apis.recommender import blocked_top_k
+
+
+def score_neighbors(book_ids, matrix, query_rows, k, block_size=8192):
+    """Recompute and store the top-``k`` neighbors of the given matrix rows.
+
+    ``book_ids`` maps matrix rows to ``Book.id``. Existing neighbors of the
+    scored books are replaced in one transaction. Returns the rows written.
+    """
+    query_rows = list(query_rows)
+    rows, scores = blocked_top_k(matrix[query_rows], matrix, k, block_size=block_size, query_rows=query_rows)
+
+    scored_ids = [book_ids[row] for row in query_rows]
+    neighbors = []
+    for book_id, neighbor_rows, neighbor_scores in zip(scored_ids, rows, scores):
+        valid = neighbor_rows >= 0
+        for rank, (neighbor_row, score) in enumerate(zip(neighbor_rows[valid], neighbor_scores[valid])):
+            neighbors.append(BookNeighbor(
+                book_id=book_id,
+                neighbor_id=book_ids[neighbor_row],
+                score=float(score),
+                rank=rank,
+            ))
+    with transaction.atomic():
+        BookNeighbor.objects.filter(book_id__in=scored_ids).delete()
+        BookNeighbor.objects.bulk_create(neighbors)
+    return len(neighbors)
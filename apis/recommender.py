@@ -0,0 +1,453 @@
+"""Prebuilt recommendation index, memory-mapped once per worker.
+
+The index is produced offline by ``manage.py buildrecindex`` and stored as a
+versioned directory of artifacts under ``settings.RECOMMENDATION_INDEX_DIR``::
+
+    <root>/CURRENT                 name of the active version
+    <root>/<version>/meta.json     format, dimensions, row count
+    <root>/<version>/vocabulary.json term (or hash bucket) -> column
+    <root>/<version>/idf.npy
+    <root>/<version>/components.npy  (optional SVD projection)
+    <root>/<version>/matrix.npy    float32, one L2-normalised row per book
+    <root>/<version>/book_ids.json row -> Book.id
+
+Catalog writes are queued in ``BookIndexChange`` by signal handlers and picked
+up by every worker within ``RECOMMENDATION_INDEX_REFRESH_SECONDS``.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError
+
+INDEX_FORMAT = 1
+CURRENT_FILE = 'CURRENT'
+DEFAULT_TOP_K = 5
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_root():
+    return Path(getattr(settings, 'RECOMMENDATION_INDEX_DIR', settings.BASE_DIR / 'recindex'))
+
+
+def book_text(title, description):
+    """Text a book is represented by in the vector space."""
+    return f"{title or ''} {description or ''}".strip()
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def reduce_dimensions(tfidf, dims):
+    """Project TF-IDF rows to ``dims`` with truncated SVD; returns ``(matrix, components)``.
+
+    ``components`` is ``None`` when there are no more than ``dims`` columns to
+    begin with and the normalised TF-IDF rows are kept as they are.
+    """
+    if 0 < dims < tfidf.shape[1]:
+        from sklearn.decomposition import TruncatedSVD
+
+        svd = TruncatedSVD(n_components=dims, random_state=0)
+        return normalize_rows(svd.fit_transform(tfidf)), svd.components_
+    return tfidf.toarray(), None
+
+
+def top_k(scores, k, exclude=()):
+    """Return row positions of the ``k`` highest scores, best first."""
+    scores = np.array(scores, dtype=np.float32, copy=True)
+    if len(exclude):
+        scores[list(exclude)] = -np.inf
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[np.argsort(-scores[candidates])]
+    return candidates[np.isfinite(scores[candidates])]
+
+
+def blocked_top_k(queries, matrix, k, block_size=4096, query_rows=None):
+    """Top-k rows of ``matrix`` for every query row, scanning ``matrix`` in blocks.
+
+    Only a ``len(queries) x block_size`` score block is held at a time, so memory
+    stays bounded however large the catalog is. ``query_rows`` gives the matrix
+    row of each query, if any, so a book is never its own neighbor.
+    Returns ``(rows, scores)`` arrays of shape ``(len(queries), k)``, best first;
+    missing slots hold row ``-1``.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        scores = queries @ block.T
+        if query_rows is not None:
+            for position, row in enumerate(query_rows):
+                if start <= row < start + len(block):
+                    scores[position, row - start] = -np.inf
+        rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_rows = np.concatenate([best_rows, rows], axis=1)
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_rows[~np.isfinite(best_scores)] = -1
+    return best_rows, best_scores
+
+
+class RecommendationIndex:
+    """One version of the index artifacts plus the changes applied since it was built.
+
+    Books written after the build are appended to a small in-memory delta
+    matrix; updated or deleted books have their base row tombstoned. Both are
+    folded back into a new version by ``manage.py compactrecindex``.
+
+    The delta is one ``(book_ids, rows, matrix)`` tuple that writers replace
+    as a whole, so a search reading it once never pairs ids with the rows of
+    a different matrix.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / 'meta.json') as file:
+            self.meta = json.load(file)
+        if self.meta.get('format') != INDEX_FORMAT:
+            raise ValueError(f"Unsupported recommendation index format in {self.path}")
+
+        with open(self.path / 'vocabulary.json') as file:
+            self.vocabulary = json.load(file)
+        with open(self.path / 'book_ids.json') as file:
+            self.book_ids = json.load(file)
+        self.rows = {book_id: row for row, book_id in enumerate(self.book_ids)}
+
+        self.idf = np.load(self.path / 'idf.npy')
+        components = self.path / 'components.npy'
+        self.components = np.load(components, mmap_mode='r') if components.exists() else None
+        self.matrix = np.load(self.path / 'matrix.npy', mmap_mode='r')
+        self._vectorizer = None
+        self._buckets = None
+        self._engine = None
+
+        self.tombstones = np.zeros(len(self.book_ids), dtype=bool)
+        self.delta = ([], {}, np.empty((0, self.matrix.shape[1]), dtype=np.float32))
+        self.last_change_id = self.meta.get('last_change_id', 0)
+        self.refreshed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.path.name
+
+    def __len__(self):
+        return len(self.book_ids) - int(self.tombstones.sum()) + len(self.delta[0])
+
+    def __contains__(self, book_id):
+        if book_id in self.delta[1]:
+            return True
+        row = self.rows.get(book_id)
+        return row is not None and not self.tombstones[row]
+
+    def transform(self, texts):
+        """Project raw texts into the index space, one normalised row per text."""
+        if self._vectorizer is None:
+            if self.meta.get('vectorizer') == 'hashing':
+                from sklearn.feature_extraction.text import HashingVectorizer
+
+                # Built at import time (apis/ingest/features.py): columns are kept hash buckets.
+                self._vectorizer = HashingVectorizer(
+                    n_features=self.meta['n_features'],
+                    alternate_sign=False,
+                    norm=None,
+                    stop_words=self.meta.get('stop_words'),
+                    dtype=np.float32,
+                )
+                buckets = sorted(self.vocabulary.items(), key=lambda item: item[1])
+                self._buckets = np.array([int(bucket) for bucket, _ in buckets], dtype=np.int64)
+            else:
+                from sklearn.feature_extraction.text import CountVectorizer
+
+                self._vectorizer = CountVectorizer(
+                    vocabulary=self.vocabulary,
+                    stop_words=self.meta.get('stop_words'),
+                    dtype=np.float32,
+                )
+        counts = self._vectorizer.transform(texts)
+        if self._buckets is not None:
+            counts = counts.tocsc()[:, self._buckets]
+        counts = counts.multiply(self.idf).tocsr()
+        vectors = normalize_rows(counts.toarray().astype(np.float32))
+        if self.components is not None:
+            vectors = normalize_rows(vectors @ self.components.T)
+        return vectors.astype(np.float32)
+
+    def vector_for(self, book_id):
+        _, delta_rows, delta_matrix = self.delta
+        if book_id in delta_rows:
+            return delta_matrix[delta_rows[book_id]]
+        row = self.rows.get(book_id)
+        if row is None or self.tombstones[row]:
+            return None
+        return np.asarray(self.matrix[row])
+
+    def upsert(self, book_ids, vectors):
+        """Replace the vectors of ``book_ids``: tombstone their base rows, append to the delta."""
+        with self._lock:
+            delta_ids, delta_rows, delta_matrix = self.delta
+            delta_ids, delta_rows = list(delta_ids), dict(delta_rows)
+            replaced, appended = {}, []
+            for book_id, vector in zip(book_ids, vectors):
+                row = self.rows.get(book_id)
+                if row is not None:
+                    self.tombstones[row] = True
+                if book_id in delta_rows:
+                    replaced[delta_rows[book_id]] = vector
+                else:
+                    delta_rows[book_id] = len(delta_ids)
+                    delta_ids.append(book_id)
+                    appended.append(vector[np.newaxis, :])
+            # vstack copies, so searches holding the old matrix never see it change
+            delta_matrix = np.vstack([delta_matrix, *appended])
+            for position, vector in replaced.items():
+                delta_matrix[position] = vector
+            self.delta = (delta_ids, delta_rows, delta_matrix)
+
+    def remove(self, book_ids):
+        """Tombstone ``book_ids`` so they are never returned again."""
+        with self._lock:
+            for book_id in book_ids:
+                row = self.rows.get(book_id)
+                if row is not None:
+                    self.tombstones[row] = True
+            delta_ids, delta_rows, delta_matrix = self.delta
+            removed = {book_id for book_id in book_ids if book_id in delta_rows}
+            if removed:
+                keep = [book_id for book_id in delta_ids if book_id not in removed]
+                self.delta = (
+                    keep,
+                    {book_id: position for position, book_id in enumerate(keep)},
+                    delta_matrix[[delta_rows[book_id] for book_id in keep]],
+                )
+
+    def load_engine(self):
+        """The configured search engine over the base matrix, as saved by ``save_engine()``."""
+        if self._engine is None:
+            from apis.ann import load_engine
+
+            self._engine = load_engine(
+                getattr(settings, 'RECOMMENDATION_ENGINE', 'exact'),
+                self.path,
+                self.matrix,
+                **getattr(settings, 'RECOMMENDATION_ENGINE_OPTIONS', {}),
+            )
+        return self._engine
+
+    def save_engine(self):
+        """Build the configured search engine and save it with the index; offline only."""
+        from apis.ann import save_engine
+
+        self._engine = save_engine(
+            getattr(settings, 'RECOMMENDATION_ENGINE', 'exact'),
+            self.path,
+            self.matrix,
+            **getattr(settings, 'RECOMMENDATION_ENGINE_OPTIONS', {}),
+        )
+        return self._engine
+
+    def _search_base(self, vector, k, exclude_rows):
+        engine = self.load_engine()
+        if engine.name == 'exact':
+            scores = self.matrix @ vector
+            scores[self.tombstones] = -np.inf
+            return [(row, float(scores[row])) for row in top_k(scores, k, exclude_rows)]
+
+        # Approximate engines know nothing of tombstones: over-fetch until enough survive.
+        skip = set(exclude_rows)
+        fetch = k + len(skip)
+        while True:
+            fetch = min(fetch, len(self.book_ids))
+            rows, scores = engine.search(vector[np.newaxis, :], fetch)
+            results = [
+                (row, float(score)) for row, score in zip(rows[0], scores[0])
+                if row >= 0 and row not in skip and not self.tombstones[row]
+            ]
+            if len(results) >= k or fetch == len(self.book_ids):
+                return results[:k]
+            fetch *= 2
+
+    def search(self, vector, k=DEFAULT_TOP_K, exclude=()):
+        """Top-k by cosine similarity; returns ``[(book_id, score), ...]``.
+
+        The base matrix is searched with ``settings.RECOMMENDATION_ENGINE``;
+        the delta of recent changes is always scanned exactly.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        exclude = set(exclude)
+        exclude_rows = [self.rows[book_id] for book_id in exclude if book_id in self.rows]
+        results = [(self.book_ids[row], score) for row, score in self._search_base(vector, k, exclude_rows)]
+
+        delta_ids, delta_rows, delta_matrix = self.delta
+        if delta_ids:
+            delta_scores = delta_matrix @ vector
+            exclude_rows = [delta_rows[book_id] for book_id in exclude if book_id in delta_rows]
+            results += [
+                (delta_ids[row], float(delta_scores[row]))
+                for row in top_k(delta_scores, k, exclude_rows)
+            ]
+            results.sort(key=lambda result: -result[1])
+        return results[:k]
+
+    def profile_vector(self, book_ids):
+        """Mean of the given books' vectors, normalised; ``None`` if none are indexed."""
+        vectors = [vector for vector in map(self.vector_for, book_ids) if vector is not None]
+        if not vectors:
+            return None
+        profile = np.asarray(vectors, dtype=np.float32).mean(axis=0)
+        return normalize_rows(profile[np.newaxis, :])[0]
+
+    def recommend_for_books(self, book_ids, k=DEFAULT_TOP_K):
+        """Top-k books for a profile built from ``book_ids``, excluding those books."""
+        profile = self.profile_vector(book_ids)
+        if profile is None:
+            return []
+        return [book_id for book_id, _ in self.search(profile, k, exclude=book_ids)]
+
+    def similar_books(self, book_id, k=DEFAULT_TOP_K):
+        vector = self.vector_for(book_id)
+        if vector is None:
+            return []
+        return [book_id for book_id, _ in self.search(vector, k, exclude=[book_id])]
+
+    def live_items(self):
+        """``(book_ids, matrix)`` of every live vector, base rows first."""
+        delta_ids, _, delta_matrix = self.delta
+        if not self.tombstones.any() and not delta_ids:
+            return self.book_ids, self.matrix
+        alive = np.flatnonzero(~self.tombstones)
+        book_ids = [self.book_ids[row] for row in alive] + list(delta_ids)
+        matrix = np.concatenate([np.asarray(self.matrix[alive]), delta_matrix])
+        return book_ids, matrix
+
+    def refresh(self, limit=None):
+        """Apply queued catalog changes the index has not seen yet.
+
+        Returns the ids of the books whose vectors changed.
+        """
+        from apis.models import Book, BookIndexChange
+
+        changes = list(
+            BookIndexChange.objects.filter(id__gt=self.last_change_id)
+            .order_by('id')
+            .values_list('id', 'book_id', 'action')[:limit]
+        )
+        self.refreshed_at = time.monotonic()
+        if not changes:
+            return []
+
+        changed = {}
+        for change_id, book_id, action in changes:
+            if action != BookIndexChange.RESCORE:
+                changed[book_id] = action
+        upserted = [book_id for book_id, action in changed.items() if action == BookIndexChange.UPSERT]
+        removed = [book_id for book_id, action in changed.items() if action == BookIndexChange.DELETE]
+
+        books = Book.objects.filter(id__in=upserted).values_list('id', 'title', 'description')
+        texts = {book_id: book_text(title, description) for book_id, title, description in books}
+        removed += [book_id for book_id in upserted if book_id not in texts]
+        upserted = [book_id for book_id in upserted if book_id in texts]
+        if upserted:
+            self.upsert(upserted, self.transform([texts[book_id] for book_id in upserted]))
+        self.remove(removed)
+        self.last_change_id = changes[-1][0]
+        return upserted + removed
+
+
+def current_version_path(root=None):
+    root = Path(root or index_root())
+    try:
+        version = (root / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return root / version if version else None
+
+
+def write_index(matrix, book_ids, vocabulary, idf, components=None, root=None, **meta):
+    """Write a new index version, build its search engine and atomically point ``CURRENT`` at it."""
+    root = Path(root or index_root())
+    version = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+    path = root / version
+    path.mkdir(parents=True)
+
+    np.save(path / 'matrix.npy', np.ascontiguousarray(matrix, dtype=np.float32))
+    np.save(path / 'idf.npy', np.asarray(idf, dtype=np.float32))
+    if components is not None:
+        np.save(path / 'components.npy', np.asarray(components, dtype=np.float32))
+    with open(path / 'vocabulary.json', 'w') as file:
+        json.dump({term: int(column) for term, column in vocabulary.items()}, file)
+    with open(path / 'book_ids.json', 'w') as file:
+        json.dump(list(book_ids), file)
+    with open(path / 'meta.json', 'w') as file:
+        json.dump(dict(meta, format=INDEX_FORMAT, rows=len(book_ids), dims=int(matrix.shape[1])), file)
+
+    # Workers only ever switch to a version whose search engine is already saved
+    RecommendationIndex(path).save_engine()
+    pointer = root / f'{CURRENT_FILE}.tmp'
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT_FILE)
+    return path
+
+
+def prune_versions(root=None, keep=2):
+    """Delete all but the ``keep`` newest index versions; returns the removed paths."""
+    root = Path(root or index_root())
+    current = current_version_path(root)
+    versions = sorted((path for path in root.iterdir() if (path / 'meta.json').exists()), reverse=True)
+    removed = [path for path in versions[keep:] if path != current]
+    for path in removed:
+        shutil.rmtree(path)
+    return removed
+
+
+def get_index():
+    """Return the worker-wide index, loading it on first use (``None`` if not built).
+
+    At most every ``RECOMMENDATION_INDEX_REFRESH_SECONDS`` the index switches
+    to a newer compacted version, if any, and applies queued catalog changes.
+    """
+    global _index
+    interval = getattr(settings, 'RECOMMENDATION_INDEX_REFRESH_SECONDS', 5)
+    if _index is not None and (interval is None or time.monotonic() - _index.refreshed_at < interval):
+        return _index
+
+    with _index_lock:
+        if _index is None or (interval is not None and time.monotonic() - _index.refreshed_at >= interval):
+            path = current_version_path()
+            if path is not None and (_index is None or path.name != _index.version):
+                index = RecommendationIndex(path)
+                index.refresh()
+                _index = index
+            elif _index is not None:
+                _index.refresh()
+    return _index
+
+
+def warm_index():
+    """Map the index into memory at worker startup so no request pays for it."""
+    try:
+        return get_index()
+    except (OSError, ValueError, DatabaseError):
+        return None
@@ -0,0 +1,217 @@
+"""Index-backed full-text search over books.
+
+PostgreSQL matches against the trigger-maintained ``tsv_*`` columns through
+their GIN indexes and uses ``pg_trgm`` trigram indexes on book titles and
+author names for typo-tolerant matching; SQLite uses the ``apis_book_fts`` and
+``apis_author_fts`` FTS5 tables (see ``apis.fts``). All are created by
+migrations 0010, 0011 and 0013.
+
+SQLite has no trigram index, so there a word that matches nothing is
+replaced by the closest indexed word starting with the same letter, by the
+trigram similarity ``pg_trgm`` computes. A typo in a word's first letter is
+therefore only tolerated on PostgreSQL.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+
+from apis.fts import rebuild_search_tables
+from apis.models import Book
+
+SEARCH_CONFIG = 'english'
+MAX_QUERY_TERMS = 32
+# Relevance weights for the parts of a book a search can match
+TITLE_WEIGHT = 2.0
+AUTHOR_WEIGHT = 0.5
+# Candidates ranked on SQLite before they are handed back as a queryset
+MAX_SEARCH_RESULTS = 1000
+# Shorter words are too short for trigrams, and in description similarity match almost everything
+MIN_TRIGRAM_TERM_LENGTH = 3
+# pg_trgm's default similarity threshold, used for SQLite's typo correction
+TYPO_SIMILARITY = 0.3
+# Indexed words differing in length by more than this are never a typo's correction
+MAX_TYPO_LENGTH_DIFFERENCE = 2
+
+_word = re.compile(r'\w+')
+
+
+def query_terms(text, limit=MAX_QUERY_TERMS, min_length=1):
+    """Distinct words of ``text`` at least ``min_length`` long, in order, safe to use in any query syntax."""
+    terms = []
+    for word in _word.findall((text or '').lower()):
+        if len(word) >= min_length and word not in terms:
+            terms.append(word)
+            if len(terms) == limit:
+                break
+    return terms
+
+
+def similar_by_text(text, limit, exclude=(), fields=None):
+    """Books whose description best matches any of the words in ``text``, best first.
+
+    ``fields`` restricts the columns loaded, as ``QuerySet.only()`` would.
+    """
+    terms = query_terms(text, min_length=MIN_TRIGRAM_TERM_LENGTH)
+    if not terms:
+        return []
+
+    if connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(exclude))
+        exclude_clause = f'AND b.id NOT IN ({placeholders})' if exclude else ''
+        columns = ', '.join(f'b.{Book._meta.get_field(name).column}' for name in fields) if fields else 'b.*'
+        return list(Book.objects.raw(
+            f"""
+            SELECT {columns} FROM apis_book_fts
+            JOIN apis_book_fts_key k ON k.id = apis_book_fts.rowid
+            JOIN apis_book b ON b.id = k.book_id
+            WHERE apis_book_fts MATCH %s {exclude_clause}
+            ORDER BY bm25(apis_book_fts)
+            LIMIT %s
+            """,
+            ['description : (' + ' OR '.join(f'"{term}"' for term in terms) + ')', *exclude, limit],
+        ))
+
+    query = SearchQuery(' or '.join(terms), search_type='websearch', config=SEARCH_CONFIG)
+    queryset = Book.objects.only(*fields) if fields else Book.objects.all()
+    return list(
+        queryset.filter(tsv_description=query)
+        .exclude(id__in=exclude)
+        .annotate(rank=SearchRank(F('tsv_description'), query))
+        .order_by('-rank')[:limit]
+    )
+
+
+def search_books(queryset, text):
+    """Filter ``queryset`` to books matching ``text`` in title, author names or description.
+
+    Results are ordered by relevance, best first.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == 'sqlite':
+        ranked = _rank_books_sqlite(terms)
+        return queryset.filter(id__in=ranked).order_by(
+            Case(*[When(id=book_id, then=Value(position)) for position, book_id in enumerate(ranked)])
+        )
+
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    author_books = Book.authors.through.objects.filter(author__name__trigram_similar=text).values('book_id')
+    # Each branch is answered by its own GIN index; ORed together in one WHERE they would scan the table
+    candidates = Book.objects.filter(tsv_title=query).values('id').union(
+        Book.objects.filter(tsv_description=query).values('id'),
+        Book.objects.filter(title__trigram_similar=text).values('id'),
+        author_books,
+    )
+    return queryset.filter(id__in=candidates).annotate(
+        rank=SearchRank(F('tsv_title'), query) * TITLE_WEIGHT
+        + SearchRank(F('tsv_description'), query)
+        + TrigramSimilarity('title', text)
+        + Case(When(id__in=author_books, then=Value(AUTHOR_WEIGHT)), default=Value(0.0), output_field=FloatField())
+    ).order_by('-rank', 'id')
+
+
+def trigrams(word):
+    """The trigrams of ``word`` as ``pg_trgm`` pads them."""
+    padded = f'  {word} '
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+def trigram_similarity(word, other):
+    """Shared trigrams over all trigrams of the two words, as ``pg_trgm``'s ``similarity()``."""
+    mine, theirs = trigrams(word), trigrams(other)
+    return len(mine & theirs) / len(mine | theirs)
+
+
+def _correct_terms_sqlite(cursor, terms):
+    """``terms``, each one that matches no indexed word followed by its closest indexed word, if any."""
+    corrected = []
+    for term in terms:
+        corrected.append(term)
+        if len(term) < MIN_TRIGRAM_TERM_LENGTH:
+            continue
+        cursor.execute(
+            """
+            SELECT EXISTS(SELECT 1 FROM apis_book_fts WHERE apis_book_fts MATCH %s)
+                OR EXISTS(SELECT 1 FROM apis_author_fts WHERE apis_author_fts MATCH %s)
+            """,
+            [f'"{term}"*'] * 2,
+        )
+        if cursor.fetchone()[0]:
+            continue
+        # Only words sharing the first letter are compared, so the scan stays a small range of each vocabulary
+        cursor.execute(
+            """
+            SELECT term FROM temp.apis_book_fts_vocab WHERE term >= %s AND term < %s
+            UNION SELECT term FROM temp.apis_author_fts_vocab WHERE term >= %s AND term < %s
+            """,
+            [term[0], chr(ord(term[0]) + 1)] * 2,
+        )
+        candidates = [
+            (trigram_similarity(term, word), word) for word, in cursor.fetchall()
+            if abs(len(word) - len(term)) <= MAX_TYPO_LENGTH_DIFFERENCE
+        ]
+        similarity, word = max(candidates, default=(0, None))
+        if similarity >= TYPO_SIMILARITY:
+            corrected.append(word)
+    return corrected
+
+
+def _rank_books_sqlite(terms):
+    """Ids of the best-matching books; terms match as prefixes to tolerate partial words."""
+    with connection.cursor() as cursor:
+        # fts5vocab tables list the indexed words; temporary, so each connection creates its own
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS temp.apis_book_fts_vocab USING fts5vocab(main, apis_book_fts, row)"
+        )
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS temp.apis_author_fts_vocab USING fts5vocab(main, apis_author_fts, row)"
+        )
+        match = ' OR '.join(f'"{term}"*' for term in _correct_terms_sqlite(cursor, terms))
+        cursor.execute(
+            """
+            SELECT id, SUM(rank) AS rank FROM (
+                SELECT k.book_id AS id, -bm25(apis_book_fts, %s, 1.0) AS rank
+                FROM apis_book_fts JOIN apis_book_fts_key k ON k.id = apis_book_fts.rowid
+                WHERE apis_book_fts MATCH %s
+                UNION ALL
+                SELECT ba.book_id AS id, %s AS rank
+                FROM apis_author_fts
+                JOIN apis_author_fts_key k ON k.id = apis_author_fts.rowid
+                JOIN apis_book_authors ba ON ba.author_id = k.author_id
+                WHERE apis_author_fts MATCH %s
+            )
+            GROUP BY id ORDER BY rank DESC, id LIMIT %s
+            """,
+            [TITLE_WEIGHT, match, AUTHOR_WEIGHT, match, MAX_SEARCH_RESULTS],
+        )
+        return [book_id for book_id, _ in cursor.fetchall()]
+
+
+def backfill_search_vectors(batch_size=5000):
+    """Recompute search data for existing rows; yields the number of rows done so far."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            rebuild_search_tables(cursor)
+        yield Book.objects.count()
+        return
+
+    done = 0
+    last_id = None
+    while True:
+        ids = Book.objects.order_by('id')
+        if last_id is not None:
+            ids = ids.filter(id__gt=last_id)
+        ids = list(ids.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        Book.objects.filter(id__in=ids).update(
+            tsv_title=SearchVector('title', config=SEARCH_CONFIG),
+            tsv_description=SearchVector('description', config=SEARCH_CONFIG),
+        )
+        done += len(ids)
+        last_id = ids[-1]
+        yield done
@@ -3,15 +3,28 @@ from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apis.models import Book, User, Author
+from common.batch_mixins import BatchListSerializer
+from common.fieldset_mixins import SparseFieldsetSerializerMixin
 
 from rest_framework import serializers
 from .models import Book, Favorite
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = '__all__'
+        # Search vectors are maintained by the database and are of no use to clients
+        exclude = ('tsv_description', 'tsv_title')
+        list_serializer_class = BatchListSerializer
+
+
+class BookCardSerializer(serializers.ModelSerializer):
+    """Compact book representation for recommendation results."""
+
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'published_date', 'isbn')
+        read_only_fields = fields
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -68,7 +81,8 @@ class UserLoginSerializer(serializers.Serializer):
         return data
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = '__all__'
+        list_serializer_class = BatchListSerializer
@@ -0,0 +1,86 @@
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apis.fts import ensure_search_sync
+from apis.models import Author, Book, BookIndexChange, BookNeighbor, User
+from common.authentication import invalidate_user
+from common.batch_mixins import batch_saved
+from common.cache_mixins import invalidate_detail, invalidate_details
+
+
+@receiver(post_save, sender=Book)
+def queue_book_upsert(sender, instance, raw=False, **kwargs):
+    """Queue a saved book so its vector is (re)computed."""
+    if not raw:
+        BookIndexChange.objects.create(book_id=instance.pk, action=BookIndexChange.UPSERT)
+
+
+@receiver(batch_saved, sender=Book)
+def queue_batch_upsert(sender, instances, **kwargs):
+    """Queue a batch of created or updated books, as ``queue_book_upsert`` does one by one."""
+    BookIndexChange.objects.bulk_create([
+        BookIndexChange(book_id=instance.pk, action=BookIndexChange.UPSERT) for instance in instances
+    ])
+
+
+@receiver(pre_delete, sender=Book)
+def queue_neighbor_rescore(sender, instance, **kwargs):
+    """Books listing the deleted book as a neighbor need their lists re-scored."""
+    book_ids = BookNeighbor.objects.filter(neighbor_id=instance.pk).values_list('book_id', flat=True)
+    BookIndexChange.objects.bulk_create([
+        BookIndexChange(book_id=book_id, action=BookIndexChange.RESCORE) for book_id in book_ids
+    ])
+
+
+@receiver(post_delete, sender=Book)
+def queue_book_delete(sender, instance, **kwargs):
+    """Queue a deleted book so it is tombstoned in the index."""
+    BookIndexChange.objects.create(book_id=instance.pk, action=BookIndexChange.DELETE)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def invalidate_cached_detail(sender, instance, **kwargs):
+    """Saved or deleted books and authors must not be served from the detail cache."""
+    invalidate_detail(sender, instance.pk)
+
+
+@receiver(batch_saved, sender=Book)
+@receiver(batch_saved, sender=Author)
+def invalidate_batch_details(sender, instances, **kwargs):
+    invalidate_details(sender, [instance.pk for instance in instances])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def touch_relinked_books(sender, instance, action, reverse, pk_set, **kwargs):
+    """A book's author list is part of its detail payload: bump ``updated_at`` and drop the cache."""
+    if action in ('post_add', 'post_remove'):
+        book_ids = list(pk_set) if reverse else [instance.pk]
+    elif action == 'post_clear' and not reverse:
+        book_ids = [instance.pk]
+    elif action == 'pre_clear' and reverse:
+        # An author's books are only known before they are cleared
+        book_ids = list(instance.books.values_list('pk', flat=True))
+    else:
+        return
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+    for book_id in book_ids:
+        invalidate_detail(Book, book_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Token authentication must see saved users, deactivations included, and deleted ones gone."""
+    invalidate_user(instance)
+
+
+@receiver(post_migrate)
+def restore_search_sync(sender, using, **kwargs):
+    """SQLite tables are altered by rebuilding them, which drops their triggers: put the search ones back."""
+    if sender.name == 'apis':
+        ensure_search_sync(connections[using])
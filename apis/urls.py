@@ -2,7 +2,9 @@
 from django.contrib import admin
 from django.urls import path
 
-from apis.views import UserSignUpView, UserLoginView, BooksAPIViewSet, AuthorAPIViewSet, FavoriteBooksAPIViewSet
+from apis import async_views
+from apis.views import UserSignUpView, UserLoginView, BooksAPIViewSet, AuthorAPIViewSet, FavoriteBooksAPIViewSet, \
+    RecommendationAPIViewSet, ExportAPIView
 
 urlpatterns = [
     # User related APIs
@@ -13,18 +15,36 @@ urlpatterns = [
     path("books/", BooksAPIViewSet.as_view({"get": "list"}), name="books"),
     path("book/<int:pk>/", BooksAPIViewSet.as_view({"get": "retrieve"}), name="book"),
     path("add_book/", BooksAPIViewSet.as_view({"post": "create"}), name="add_book"),
+    path("add_books/", BooksAPIViewSet.as_view({"post": "batch_create"}), name="add_books"),
     path("update_book/<int:pk>/", BooksAPIViewSet.as_view({"put": "update"}), name="update_book"),
+    path("update_books/", BooksAPIViewSet.as_view({"put": "batch_update"}), name="update_books"),
     path("delete_book/<int:pk>/", BooksAPIViewSet.as_view({"delete": "destroy"}), name="delete_book"),
 
     # Author related APIs
     path("authors/", AuthorAPIViewSet.as_view({"get": "list"}), name="authors"),
     path("author/<int:pk>/", AuthorAPIViewSet.as_view({"get": "retrieve"}), name="author"),
     path("add_author/", AuthorAPIViewSet.as_view({"post": "create"}), name="add_author"),
+    path("add_authors/", AuthorAPIViewSet.as_view({"post": "batch_create"}), name="add_authors"),
     path("update_author/<int:pk>/", AuthorAPIViewSet.as_view({"put": "update"}), name="update_author"),
+    path("update_authors/", AuthorAPIViewSet.as_view({"put": "batch_update"}), name="update_authors"),
     path("delete_author/<int:pk>/", AuthorAPIViewSet.as_view({"delete": "destroy"}), name="delete_author"),
 
     # Favourite related APIs
     path("favorites/", FavoriteBooksAPIViewSet.as_view({"get": "list", "post": "create"}), name="favorites-list-create"),
+    path("favorites/batch/", FavoriteBooksAPIViewSet.as_view({"post": "batch_create"}), name="favorites-batch"),
     path("favorites/<int:pk>/", FavoriteBooksAPIViewSet.as_view({"delete": "destroy"}), name="favorites-delete"),
 
+    # Recommendation related APIs
+    path("recommendations/", RecommendationAPIViewSet.as_view({"get": "list"}), name="recommendations"),
+    path("recommendations/latest/", RecommendationAPIViewSet.as_view({"get": "latest"}), name="latest-recommendations"),
+
+    # Async variants of the favorite and recommendation APIs, for ASGI workers
+    path("async/favorites/", async_views.favorites, name="async-favorites"),
+    path("async/recommendations/", async_views.recommendations, name="async-recommendations"),
+    path("async/recommendations/latest/", async_views.latest_recommendations, name="async-latest-recommendations"),
+
+    # Bulk export APIs
+    path("export/books.jsonl", ExportAPIView.as_view(export="books"), name="export-books"),
+    path("export/authors.jsonl", ExportAPIView.as_view(export="authors"), name="export-authors"),
+
 ]
@@ -1,11 +1,14 @@
 import ast
+import logging
 import random
+import re
 from datetime import datetime
 
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel, cosine_similarity
-import faiss
-from django.db import connection
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 
 from apis.models import Book
 from django.db.models import Q, Count
@@ -13,35 +16,80 @@ from rest_framework.permissions import IsAuthenticated
 import numpy as np
 from apis.models import Book, User, Author
 from apis.serializers import BookSerializer, UserSignupSerializer, UserLoginSerializer, AuthorSerializer
+from common.batch_mixins import BatchWriteMixin
+from common.cache_mixins import ConditionalDetailMixin
+from common.fast_serializers import FastListMixin, ValuesSerializer, fast_serialization_enabled
+from common.fieldset_mixins import SparseFieldsetViewMixin
+from common.pagination import KeysetPagination, RankedPagination
 from common.response_mixins import BaseAPIView
 from rest_framework.viewsets import ModelViewSet
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import Book, Favorite
-from .serializers import BookSerializer, FavoriteSerializer
+from .export import EXPORTS, gzip_stream
+from .jobs import queue_recommendations, recommendation_state, wait_for_recommendations
+from .models import Book, BookNeighbor, Favorite
+from .recommender import DEFAULT_TOP_K, get_index
+from .search import search_books, similar_by_text
+from .serializers import BookCardSerializer, BookSerializer, FavoriteSerializer
 
+logger = logging.getLogger(__name__)
 
-class BooksAPIViewSet(BaseAPIView, ModelViewSet):
+MAX_RECOMMENDATIONS = 50
+
+
+def recommended_cards(book_ids):
+    """The books for ``book_ids``, in that order, with only the card columns loaded."""
+    books = Book.objects.only(*BookCardSerializer.Meta.fields).in_bulk(book_ids)
+    return [books[book_id] for book_id in book_ids if book_id in books]
+
+
+def recommended_card_data(book_ids):
+    """``BookCardSerializer`` data for ``book_ids``, in that order."""
+    compiled = ValuesSerializer.compile(BookCardSerializer()) if fast_serialization_enabled() else None
+    if compiled is None:
+        return BookCardSerializer(recommended_cards(book_ids), many=True).data
+    rows = {row['id']: row for row in compiled.values(Book.objects.filter(id__in=book_ids))}
+    return compiled.to_representation([rows[book_id] for book_id in book_ids if book_id in rows])
+
+
+def latest_recommendations_payload(result, pending):
+    """Response body for a ``UserRecommendation`` (``None`` without favorites) from ``recommendation_state()``."""
+    return {
+        "status": "pending" if pending else "ready",
+        "book_id": result.book_id if result else None,
+        "computed_at": result.computed_at if result else None,
+        "recommendations": recommended_card_data(result.book_ids if result else []),
+    }
+
+
+class BooksAPIViewSet(ConditionalDetailMixin, SparseFieldsetViewMixin, FastListMixin, BatchWriteMixin, BaseAPIView,
+                      ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = RankedPagination
+    fieldset_columns = ('updated_at',)  # read by ConditionalDetailMixin
+    token_user_reads = True
 
     def get_queryset(self):
         queryset = super().get_queryset()
         search_query = self.request.query_params.get('search', None)
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query)
-            )
-        return queryset[:10]
+            queryset = search_books(queryset, search_query)
+        return queryset
 
 
-class AuthorAPIViewSet(BaseAPIView, ModelViewSet):
+class AuthorAPIViewSet(ConditionalDetailMixin, SparseFieldsetViewMixin, FastListMixin, BatchWriteMixin, BaseAPIView,
+                       ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    fieldset_columns = ('updated_at',)  # read by ConditionalDetailMixin
+    token_user_reads = True
 
 
 class UserSignUpView(BaseAPIView, ModelViewSet):
@@ -94,6 +142,8 @@ class FavoriteBooksAPIViewSet(ModelViewSet):
     queryset = Favorite.objects.all()
     serializer_class = FavoriteSerializer
     permission_classes = [IsAuthenticated]
+    max_favorites = 20
+    batch_max_size = 100
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
@@ -104,55 +154,92 @@ class FavoriteBooksAPIViewSet(ModelViewSet):
         if not book_id:
             return Response({"error": "Book ID is required."}, status=400)
 
-        if Favorite.objects.filter(user=user).count() >= 20:
-            return Response({"error": "Max of 20 favorite books allowed."}, status=400)
+        if Favorite.objects.filter(user=user).count() >= self.max_favorites:
+            return Response({"error": f"Max of {self.max_favorites} favorite books allowed."}, status=400)
 
         favorite, created = Favorite.objects.get_or_create(user=user, book_id=book_id)
         # if not created:
         #     return Response({"error": "Book is already in your favorites."}, status=400)
 
-        recommendations = self.get_recommendations(favorite.book.tsv_description)
+        # Recommendations for the new favorite are computed in the background (apis/jobs.py)
+        if created:
+            queue_recommendations(user.id)
         serializer = self.get_serializer(favorite)
         return Response({
             "favorite": serializer.data,
-            "recommendations": BookSerializer(recommendations, many=True).data
+            "recommendations_url": request.build_absolute_uri(reverse("latest-recommendations")),
         })
 
-    def get_recommendations(self, favorite_descriptions):
+    def batch_create(self, request, *args, **kwargs):
+        """Add several favorites from a list of ``{"book_id": ...}`` objects, reporting each."""
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Expected a list of objects."}, status=400)
+        if len(items) > self.batch_max_size:
+            return Response({"error": f"At most {self.batch_max_size} objects per request."}, status=400)
+
+        book_ids = [str(item['book_id']) if isinstance(item, dict) and item.get('book_id') else None for item in items]
+        books = set(Book.objects.filter(id__in=[book_id for book_id in book_ids if book_id]).values_list('id', flat=True))
+        results, added = [], []
+        with transaction.atomic():
+            favorites = set(
+                Favorite.objects.select_for_update().filter(user=request.user).values_list('book_id', flat=True)
+            )
+            for index, book_id in enumerate(book_ids):
+                result = {"index": index, "book_id": book_id}
+                if not book_id:
+                    result.update(status="error", error="Book ID is required.")
+                elif book_id not in books:
+                    result.update(status="error", error="Book not found.")
+                elif book_id in favorites:
+                    result.update(status="exists")
+                elif len(favorites) >= self.max_favorites:
+                    result.update(status="error", error=f"Max of {self.max_favorites} favorite books allowed.")
+                else:
+                    favorites.add(book_id)
+                    added.append(Favorite(user=request.user, book_id=book_id))
+                    result.update(status="created")
+                results.append(result)
+            Favorite.objects.bulk_create(added, ignore_conflicts=True)
+            if added:
+                queue_recommendations(request.user.id)
+
+        failed = sum(result["status"] == "error" for result in results)
+        return Response({
+            "saved": len(added),
+            "failed": failed,
+            "results": results,
+        }, status=400 if results and failed == len(results) else 200)
+
+    def get_recommendations(self, book, k=DEFAULT_TOP_K):
+        """Search the live index, then the precomputed neighbors, then rank by text.
+
+        The index applies queued catalog changes within seconds, edits and
+        deletes included; stored neighbors only change when they are rebuilt,
+        so they serve books the index does not hold (yet).
+        """
+        index = get_index()
+        if index is not None and book.id in index:
+            return recommended_cards(index.similar_books(book.id, k))
+
+        recommended_books = self.get_neighbor_recommendations(book, k)
+        if recommended_books:
+            return recommended_books
+        return self.get_text_recommendations(book, k)
+
+    def get_neighbor_recommendations(self, book, k=DEFAULT_TOP_K):
+        neighbors = (
+            BookNeighbor.objects.filter(book_id=book.id).order_by('rank').select_related('neighbor')
+            .only('neighbor', *(f'neighbor__{name}' for name in BookCardSerializer.Meta.fields))[:k]
+        )
+        return [neighbor.neighbor for neighbor in neighbors]
+
+    def get_text_recommendations(self, book, k=DEFAULT_TOP_K):
         start_time = datetime.now()
-        print(f"start time {start_time}")
-        if isinstance(favorite_descriptions, str):
-            favorite_descriptions = [favorite_descriptions]
-
-        # Escape special characters and join descriptions into a tsquery format
-        def format_query(descriptions):
-            formatted_descriptions = []
-            for desc in descriptions:
-                # Escape single quotes and format as tsquery term
-                formatted_desc = desc.replace("'", "''")
-                formatted_descriptions.append(f"'{formatted_desc}'")
-            return ' & '.join(formatted_descriptions)
-
-        ts_query = format_query(favorite_descriptions)
-
-        # Perform the search using raw SQL
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, title, ts_rank(tsv_description, plainto_tsquery(%s)) AS rank
-                FROM apis_book
-                WHERE ts_rank(tsv_description, to_tsquery(%s)) > 0
-                ORDER BY rank DESC
-                LIMIT 5
-            """, [ts_query, ts_query])
-
-            results = cursor.fetchall()
-
-        # Fetch recommended books
-        recommended_books = []
-        for book_id, title, rank in results:
-            book = Book.objects.get(id=book_id)
-            recommended_books.append(book)
-        print(f"end time {datetime.now() - start_time}")
+        recommended_books = similar_by_text(
+            book.description, k, exclude=[book.id], fields=BookCardSerializer.Meta.fields
+        )
+        logger.debug("Text recommendations for book %s took %s", book.id, datetime.now() - start_time)
         return recommended_books
 
     # def get_recommendations(self, favorite_descriptions):
@@ -234,3 +321,66 @@ class FavoriteBooksAPIViewSet(ModelViewSet):
     #     recommended_books = [all_books[i] for i in I.flatten()]
     #
     #     return recommended_books
+
+
+class RecommendationAPIViewSet(ModelViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookCardSerializer
+    permission_classes = [IsAuthenticated]
+    token_user_reads = True
+    max_recommendations = MAX_RECOMMENDATIONS
+    max_wait = 30
+
+    def list(self, request, *args, **kwargs):
+        """Recommend books for the profile formed by all of the user's favorites."""
+        try:
+            k = min(int(request.query_params.get('k', DEFAULT_TOP_K)), self.max_recommendations)
+        except ValueError:
+            return Response({"error": "k must be an integer."}, status=400)
+
+        favorite_ids = list(Favorite.objects.filter(user_id=request.user.id).values_list('book_id', flat=True))
+        index = get_index()
+        book_ids = index.recommend_for_books(favorite_ids, k) if index is not None else []
+        return Response({
+            "recommendations": recommended_card_data(book_ids)
+        })
+
+    def latest(self, request, *args, **kwargs):
+        """Recommendations for the user's latest favorite, as computed in the background.
+
+        While they are still being computed the previous ones are returned with
+        ``"status": "pending"``; ``?wait=<seconds>`` holds the request until
+        they are ready, for at most ``max_wait`` seconds.
+        """
+        try:
+            wait = min(max(float(request.query_params.get('wait', 0)), 0), self.max_wait)
+        except ValueError:
+            return Response({"error": "wait must be a number."}, status=400)
+
+        result, pending = recommendation_state(request.user.id)
+        if pending:
+            # Also recovers jobs lost with a restarted worker
+            queue_recommendations(request.user.id)
+            if wait:
+                result, pending = wait_for_recommendations(request.user.id, wait)
+        return Response(latest_recommendations_payload(result, pending))
+
+
+class ExportAPIView(APIView):
+    """Stream a whole table as JSON lines, gzip-compressed if the client accepts it."""
+    permission_classes = [IsAuthenticated]
+    token_user_reads = True
+    export = None
+    accepts_gzip = re.compile(r'\bgzip\b')
+
+    def get(self, request, *args, **kwargs):
+        lines = EXPORTS[self.export]()
+        gzip = self.accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = StreamingHttpResponse(
+            gzip_stream(lines) if gzip else lines, content_type='application/x-ndjson'
+        )
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="{self.export}.jsonl"'
+        return response
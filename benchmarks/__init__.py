@@ -0,0 +1,16 @@
+"""Recommendation benchmarks: synthetic catalogs and repeatable timing harnesses.
+
+    python -m benchmarks.generate --size 100k
+    python -m benchmarks.run --queries 200 --output results.json
+
+Both use the project settings; point ``DJANGO_SETTINGS_MODULE`` at a
+dedicated database before generating data.
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
+    import django
+
+    django.setup()
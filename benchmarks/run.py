@@ -0,0 +1,129 @@
+"""Time each recommendation strategy and report latency percentiles and peak RSS.
+
+    python -m benchmarks.run [--strategies text_rank index ...] [--queries 200]
+                             [--k 5] [--output results.json]
+
+Every strategy runs in its own freshly spawned process so its peak RSS is
+not inflated by the ones before it. Query books are sampled with a fixed
+seed, so two runs against the same catalog compare like for like. The JSON
+report records the git commit to make regressions easy to trace.
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import numpy as np
+
+from benchmarks import setup_django
+from benchmarks.strategies import REFIT_STRATEGIES, STRATEGIES
+
+WARMUP_QUERIES = 3
+
+
+def query_books(count, seed):
+    from apis.models import Book, Favorite
+
+    rng = random.Random(seed)
+    favorites = list(Favorite.objects.order_by('book_id').values_list('book_id', flat=True).distinct()[:count * 10])
+    picks = rng.sample(favorites, min(count, len(favorites)))
+    if len(picks) < count:
+        # Too few favorited books: top up with catalog books
+        picked = set(picks)
+        others = [
+            book_id for book_id in Book.objects.order_by('id').values_list('id', flat=True)[:count * 10 + len(picks)]
+            if book_id not in picked
+        ]
+        picks += rng.sample(others, min(count - len(picks), len(others)))
+    books = Book.objects.in_bulk(picks)
+    return [books[pick] for pick in picks]
+
+
+def run_strategy(name, queries, k, seed):
+    """Entry point of the child process for one strategy."""
+    setup_django()
+    strategy = STRATEGIES[name]
+    books = query_books(queries + WARMUP_QUERIES, seed)
+
+    latencies, errors = [], []
+    for position, book in enumerate(books):
+        started = time.perf_counter()
+        try:
+            strategy(book, k)
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        if position >= WARMUP_QUERIES:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    return {
+        'queries': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)) if latencies else None,
+        'p95_ms': float(np.percentile(latencies, 95)) if latencies else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if latencies else None,
+        'mean_ms': float(np.mean(latencies)) if latencies else None,
+        'peak_rss_mb': round(peak_rss_mb, 1),
+        'errors': errors[:5],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES,
+                        default=[name for name in STRATEGIES if name not in REFIT_STRATEGIES])
+    parser.add_argument('--queries', type=int, default=100, help='Timed queries per strategy')
+    parser.add_argument('--k', type=int, default=5, help='Recommendations per query')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    setup_django()
+    from apis.models import Book
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'books': Book.objects.count(),
+        'k': args.k,
+        'strategies': {},
+    }
+    for name in args.strategies:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(run_strategy, name, args.queries, args.k, args.seed).result()
+        report['strategies'][name] = result
+        latency = ' '.join(
+            f"{key}={result[f'{key}_ms']:.3f}ms" if result[f'{key}_ms'] is not None else f'{key}=n/a'
+            for key in ('p50', 'p95', 'p99')
+        )
+        print(f"{name:<20} {latency} rss={result['peak_rss_mb']}MB", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    untimed = [name for name, result in report['strategies'].items() if not result['queries']]
+    if untimed:
+        sys.exit(f"No timed queries ran for {', '.join(untimed)}: the catalog is empty or every query failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Recommendation strategies from ``FavoriteBooksAPIViewSet``, as benchmarkable callables.
+
+Each strategy takes the favorited ``Book`` and ``k`` and returns recommended
+book ids. ``text_rank`` is the text-search fallback the view uses today;
+``tfidf_linear_kernel``, ``tfidf_cosine`` and ``faiss_flat`` reproduce the
+commented-out variants kept in ``apis/views.py``, which refit everything on
+every call; ``index``, ``neighbors`` and ``profile`` are the prebuilt paths.
+"""
+import numpy as np
+
+
+def text_rank(book, k):
+    from apis.search import similar_by_text
+
+    return [recommended.id for recommended in similar_by_text(book.description, k, exclude=[book.id])]
+
+
+def _catalog():
+    from apis.models import Book
+
+    books = list(Book.objects.values_list('id', 'description'))
+    return [book_id for book_id, _ in books], [description or '' for _, description in books]
+
+
+def tfidf_linear_kernel(book, k):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import linear_kernel
+
+    book_ids, descriptions = _catalog()
+    vectorizer = TfidfVectorizer()
+    vectorizer.fit(descriptions)
+    similarities = linear_kernel(vectorizer.transform([book.description or '']), vectorizer.transform(descriptions))
+    return [book_ids[i] for i in similarities.mean(axis=0).argsort()[-k:][::-1]]
+
+
+def tfidf_cosine(book, k):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    book_ids, descriptions = _catalog()
+    vectors = TfidfVectorizer().fit_transform(descriptions + [book.description or ''])
+    similarities = cosine_similarity(vectors[-1], vectors[:-1])[0]
+    return [book_ids[i] for i in similarities.argsort()[-k:][::-1]]
+
+
+def faiss_flat(book, k):
+    import faiss
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    book_ids, descriptions = _catalog()
+    tfidf = TfidfVectorizer(stop_words='english', max_features=5000)
+    matrix = tfidf.fit_transform(descriptions).toarray().astype(np.float32)
+    index = faiss.IndexFlatL2(matrix.shape[1])
+    index.add(matrix)
+    _, rows = index.search(tfidf.transform([book.description or '']).toarray().astype(np.float32), k)
+    return [book_ids[i] for i in rows.flatten()]
+
+
+def index(book, k):
+    from apis.recommender import get_index
+
+    return get_index().similar_books(book.id, k)
+
+
+def neighbors(book, k):
+    from apis.models import BookNeighbor
+
+    return list(
+        BookNeighbor.objects.filter(book_id=book.id).order_by('rank').values_list('neighbor_id', flat=True)[:k]
+    )
+
+
+def profile(book, k):
+    from apis.models import Favorite
+    from apis.recommender import get_index
+
+    user_id = Favorite.objects.filter(book_id=book.id).values_list('user_id', flat=True).first()
+    favorites = list(Favorite.objects.filter(user_id=user_id).values_list('book_id', flat=True)) or [book.id]
+    return get_index().recommend_for_books(favorites, k)
+
+
+STRATEGIES = {
+    strategy.__name__: strategy
+    for strategy in (text_rank, tfidf_linear_kernel, tfidf_cosine, faiss_flat, index, neighbors, profile)
+}
+# Strategies that refit on the whole catalog per call; too slow to run by default at 1M books.
+REFIT_STRATEGIES = ('tfidf_linear_kernel', 'tfidf_cosine', 'faiss_flat')
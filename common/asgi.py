@@ -0,0 +1,66 @@
+"""ASGI handler that produces streaming response bodies off the event loop."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+
+_done = object()
+
+
+def _close_stream(response):
+    # Runs on the thread that produced the body, where its connection (and any open cursor) lives
+    response.close()
+    connections.close_all()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """``ASGIHandler`` awaiting each chunk of a streaming body instead of iterating it on the loop.
+
+    Django 3.2 iterates a ``StreamingHttpResponse`` right on the event loop,
+    so a body reading the database either fails (the ORM refuses to run
+    there) or stalls every other request while a chunk is produced. Here each
+    streaming response gets one thread of its own: chunks are produced there,
+    one ``run_in_executor()`` call at a time, and the body's connection stays
+    on that thread until it is closed at the end.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append((b'Set-Cookie', c.output(header='').encode('ascii').strip()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers})
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream')
+        try:
+            parts = await loop.run_in_executor(executor, iter, response)
+            while True:
+                part = await loop.run_in_executor(executor, next, parts, _done)
+                if part is _done:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            await loop.run_in_executor(executor, _close_stream, response)
+            executor.shutdown(wait=False)
+            # As response.close() does for the thread the view ran on
+            await sync_to_async(close_old_connections, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    """``django.core.asgi.get_asgi_application()`` returning a ``StreamingASGIHandler``."""
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
@@ -0,0 +1,92 @@
+"""JWT authentication that resolves users without a query on every request.
+
+``CachedJWTAuthentication`` looks the token's user up in a small per-process
+cache, then in Django's cache, and only then in the database. Saving or
+deleting a user calls ``invalidate_user()`` (see ``apis/signals.py``), which
+clears the shared entry and this process's; other processes keep theirs for
+at most ``JWT_USER_LOCAL_CACHE_SECONDS``. Queryset ``update()`` calls send no
+signal, so a user deactivated that way stays cached until the entries expire.
+Users are cached without their password hash, which is loaded only if read.
+"""
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import User
+
+# Entries kept in the per-process cache before it is emptied
+LOCAL_CACHE_SIZE = 10000
+
+_local_users = {}  # user id -> (expires at, user)
+
+
+def user_cache_key(user_id):
+    return f'jwt-user:{user_id}'
+
+
+def invalidate_user(user):
+    """Forget a cached user; call whenever the user is saved or deleted."""
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    cache.delete(user_cache_key(user_id))
+    _local_users.pop(user_id, None)
+
+
+def resolve_user(user_id):
+    """The user with ``USER_ID_FIELD`` ``user_id``, from a cache if possible; ``None`` if there is none."""
+    now = time.monotonic()
+    entry = _local_users.get(user_id)
+    if entry is not None and entry[0] > now:
+        user = entry[1]
+    else:
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = User.objects.defer('password').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None:
+                return None
+            cache.set(key, user, getattr(settings, 'JWT_USER_CACHE_SECONDS', 300))
+        if len(_local_users) >= LOCAL_CACHE_SIZE:
+            _local_users.clear()
+        _local_users[user_id] = (now + getattr(settings, 'JWT_USER_LOCAL_CACHE_SECONDS', 5), user)
+    # Each request gets its own copy, so changes made while serving one never leak into the cache
+    return copy.copy(user)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` resolving users through ``resolve_user()``.
+
+    With ``settings.JWT_TOKEN_USER_READS``, safe-method requests to views
+    that set ``token_user_reads = True`` skip the lookup altogether and get
+    simplejwt's stateless ``TokenUser``, which only carries the token's
+    claims (``id``, ``pk``, ...). Such views must not need anything else of
+    the user; a deactivated user keeps read access until the token expires.
+    """
+
+    def authenticate(self, request):
+        self.token_user = False
+        if request.method in SAFE_METHODS and getattr(settings, 'JWT_TOKEN_USER_READS', False):
+            context = getattr(request, 'parser_context', None) or {}
+            self.token_user = getattr(context.get('view'), 'token_user_reads', False)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if self.token_user:
+            return TokenUser(validated_token)
+
+        user = resolve_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,198 @@
+"""Batch create and update: many objects per request, written in one transaction."""
+from django.db import IntegrityError, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+# Sent after a batch is written, with ``instances`` and ``created``. Bulk writes
+# bypass post_save and m2m_changed, so this is where their side effects hook in.
+batch_saved = Signal()
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """``many=True`` serializer whose items succeed or fail on their own.
+
+    Per-item validation runs every field validator except database lookups:
+    unique fields and primary-key related fields are checked afterwards with
+    one query per field for the whole batch instead of one per item. Items
+    are matched to existing rows on their primary key, which must be
+    writable.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unique_fields = []
+        self.related_fields = {}
+        if not hasattr(self, 'initial_data'):
+            return  # serializing instances: the fields stay as they are
+        for name, field in list(self.child.fields.items()):
+            if field.read_only:
+                continue
+            unique = [validator for validator in field.validators if isinstance(validator, UniqueValidator)]
+            if unique:
+                field.validators = [validator for validator in field.validators if validator not in unique]
+                self.unique_fields.append(field.source)
+            if isinstance(field, serializers.ManyRelatedField) and hasattr(field.child_relation, 'queryset'):
+                self.related_fields[field.source] = field.child_relation.queryset
+                source = {'source': field.source} if field.source != name else {}
+                self.child.fields[name] = serializers.ListField(
+                    child=serializers.CharField(), required=field.required, allow_empty=field.allow_empty, **source
+                )
+
+    @property
+    def model(self):
+        return self.child.Meta.model
+
+    def validate_items(self, update=False):
+        """Validate ``initial_data`` item by item; returns ``[(validated_data, errors)]``.
+
+        With ``update`` every item must name an existing row, otherwise none may.
+        """
+        results = []
+        for item in self.initial_data:
+            try:
+                results.append((self.child.run_validation(item), {}))
+            except serializers.ValidationError as e:
+                results.append((None, e.detail))
+        for source in self.unique_fields:
+            self._check_unique(results, source, update)
+        for source, queryset in self.related_fields.items():
+            self._check_related(results, source, queryset)
+        return results
+
+    def _check_unique(self, results, source, update):
+        meta = self.model._meta
+        pk = meta.pk.name
+        values = {data[source] for data, errors in results if not errors and source in data}
+        owners = dict(self.model._default_manager.filter(**{f'{source}__in': values}).values_list(source, pk))
+        seen = set()
+        for data, errors in results:
+            if errors or source not in data:
+                continue
+            value = data[source]
+            if value in seen:
+                errors[source] = [f'Duplicate {source} in this batch.']
+            elif source == pk and update and value not in owners:
+                errors[source] = [f'No {meta.verbose_name} with this {source}.']
+            elif value in owners and not (update and owners[value] == data.get(pk)):
+                errors[source] = [f'{meta.verbose_name} with this {source} already exists.']
+            seen.add(value)
+
+    def _check_related(self, results, source, queryset):
+        wanted = {value for data, errors in results if not errors for value in data.get(source, ())}
+        found = {str(pk) for pk in queryset.filter(pk__in=wanted).values_list('pk', flat=True)}
+        for data, errors in results:
+            if errors:
+                continue
+            missing = [value for value in data.get(source, ()) if value not in found]
+            if missing:
+                errors[source] = [f'Invalid pk "{value}" - object does not exist.' for value in missing]
+
+    def save_items(self, results, update=False):
+        """Write the valid items of ``validate_items()`` results; returns their instances, in order.
+
+        Call inside a transaction. Rows may have changed since validation:
+        rows to update are locked first, and an item whose row is gone, or
+        whose unique value another row took meanwhile, gets an error in
+        ``results`` instead of failing the whole batch.
+        """
+        meta = self.model._meta
+        pk = meta.pk.name
+        if update:
+            wanted = [data[pk] for data, errors in results if not errors]
+            locked = set(self.model._default_manager.select_for_update().filter(pk__in=wanted)
+                         .values_list(pk, flat=True))
+            for data, errors in results:
+                if not errors and data[pk] not in locked:
+                    errors[pk] = [f'No {meta.verbose_name} with this {pk}.']
+        try:
+            with transaction.atomic():
+                return self.bulk_save([data for data, errors in results if not errors], update=update)
+        except IntegrityError:
+            # Check the unique values again, now that the clashing rows are visible, and retry once
+            for source in self.unique_fields:
+                self._check_unique(results, source, update)
+            return self.bulk_save([data for data, errors in results if not errors], update=update)
+
+    def bulk_save(self, items, update=False):
+        """Write validated ``items`` with ``bulk_create`` or ``bulk_update``; returns the instances."""
+        meta = self.model._meta
+        manager = self.model._default_manager
+        pk = meta.pk.name
+        rows = [{name: value for name, value in data.items() if name not in self.related_fields} for data in items]
+        if update:
+            existing = manager.in_bulk([row[pk] for row in rows])
+            instances = []
+            fields = {name for row in rows for name in row} - {pk}
+            now = timezone.now()
+            for row in rows:
+                instance = existing[row[pk]]
+                for name, value in row.items():
+                    setattr(instance, name, value)
+                # bulk_update() does not run pre_save(), so auto_now fields are set here
+                for field in meta.concrete_fields:
+                    if getattr(field, 'auto_now', False):
+                        setattr(instance, field.attname, now)
+                        fields.add(field.name)
+                instances.append(instance)
+            if fields:
+                manager.bulk_update(instances, fields)
+        else:
+            instances = manager.bulk_create([self.model(**row) for row in rows])
+
+        for source in self.related_fields:
+            field = meta.get_field(source)
+            through = field.remote_field.through
+            column, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+            linked = [(instance, data[source]) for instance, data in zip(instances, items) if source in data]
+            if update:
+                through.objects.filter(**{f'{column}__in': [instance.pk for instance, _ in linked]}).delete()
+            through.objects.bulk_create(
+                [through(**{column: instance.pk, target: value}) for instance, values in linked for value in values],
+                ignore_conflicts=True,
+            )
+        return instances
+
+
+class BatchWriteMixin:
+    """``batch_create`` / ``batch_update`` actions taking a JSON array of objects.
+
+    The serializer's ``Meta.list_serializer_class`` must be
+    ``BatchListSerializer``. Valid items are written in one transaction; the
+    response reports every item as created, updated or failed, in order.
+    """
+    batch_max_size = 1000
+
+    def batch_create(self, request, *args, **kwargs):
+        return self.batch_write(request, update=False)
+
+    def batch_update(self, request, *args, **kwargs):
+        return self.batch_write(request, update=True)
+
+    def batch_write(self, request, update):
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of objects."}, status=400)
+        if len(request.data) > self.batch_max_size:
+            return Response({"error": f"At most {self.batch_max_size} objects per request."}, status=400)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        results = serializer.validate_items(update=update)
+        with transaction.atomic():
+            instances = serializer.save_items(results, update=update)
+            batch_saved.send(sender=serializer.model, instances=instances, created=not update)
+
+        saved = iter(instances)
+        status = 'updated' if update else 'created'
+        items = []
+        for index, (data, errors) in enumerate(results):
+            if errors:
+                items.append({"index": index, "status": "error", "errors": errors})
+            else:
+                items.append({"index": index, "id": next(saved).pk, "status": status})
+        return Response({
+            "saved": len(instances),
+            "failed": len(results) - len(instances),
+            "results": items,
+        }, status=200 if instances or not results else 400)
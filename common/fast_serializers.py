@@ -0,0 +1,151 @@
+"""Serializing ``.values()`` rows with the output of a DRF ``ModelSerializer``.
+
+A ``ModelSerializer`` re-binds its fields for every instance and calls each
+field's ``to_representation()``. ``ValuesSerializer`` inspects a serializer's
+fields once, compiles the conversion each needs (most need none), and then
+turns plain ``.values()`` rows into the same dicts. Many-to-many primary key
+fields are filled with one through-table query per batch of rows.
+
+Serializers with fields it cannot reproduce exactly (nested serializers,
+method fields, custom formats, dotted sources) are not compiled, and callers
+fall back to the serializer itself. Enabled by ``settings.FAST_SERIALIZATION``.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+_compiled = {}
+
+
+def fast_serialization_enabled():
+    return getattr(settings, 'FAST_SERIALIZATION', False)
+
+
+def _utc_isoformat(value):
+    return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _date_isoformat(value):
+    return value.isoformat()
+
+
+def _converter(field):
+    """``(convert, supported)`` for a serializer field; ``convert`` is ``None`` when values pass as they are."""
+    if isinstance(field, fields.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = getattr(field, 'timezone', field.default_timezone())
+        if output_format and output_format.lower() == ISO_8601 and field_timezone == timezone.utc:
+            return _utc_isoformat, True
+        return None, False
+    if isinstance(field, fields.DateField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        return _date_isoformat, bool(output_format) and output_format.lower() == ISO_8601
+    if isinstance(field, fields.ModelField):
+        return lambda value: value if fields.is_protected_type(value) else str(value), True
+    if isinstance(field, (fields.CharField, fields.IntegerField, fields.FloatField, fields.BooleanField,
+                          fields.JSONField, fields.ReadOnlyField, relations.PrimaryKeyRelatedField)):
+        # Database values already are what these fields would output
+        return None, not isinstance(field, fields.JSONField) or not field.binary
+    return None, False
+
+
+class ValuesSerializer:
+    """The compiled form of a ``ModelSerializer`` instance's readable fields."""
+
+    def __init__(self, model, columns, fields, related):
+        self.model = model
+        self.columns = columns  # names to pass to .values()
+        self.fields = fields  # (output name, column, convert)
+        self.related = related  # (output name, many-to-many model field)
+
+    @classmethod
+    def compile(cls, serializer):
+        """A ``ValuesSerializer`` for ``serializer``, or ``None`` if it has unsupported fields.
+
+        ``serializer`` is a bound instance, so sparse fieldsets apply;
+        compiled forms are reused for the same class and field names.
+        """
+        readable = [(name, field) for name, field in serializer.fields.items() if not field.write_only]
+        key = (type(serializer), tuple(name for name, _ in readable))
+        if key not in _compiled:
+            _compiled[key] = cls._compile(serializer.Meta.model, readable)
+        return _compiled[key]
+
+    @classmethod
+    def _compile(cls, model, readable):
+        meta = model._meta
+        concrete = {field.name: field for field in meta.concrete_fields}
+        columns, compiled, related = [meta.pk.name], [], []
+        for name, field in readable:
+            source = field.source
+            if isinstance(field, relations.ManyRelatedField):
+                model_field = next((f for f in meta.many_to_many if f.name == source), None)
+                if model_field is None or not isinstance(field.child_relation, relations.PrimaryKeyRelatedField):
+                    return None
+                related.append((name, model_field))
+                compiled.append((name, None, None))
+                continue
+            if source not in concrete:
+                return None
+            convert, supported = _converter(field)
+            if not supported:
+                return None
+            columns.append(source)
+            compiled.append((name, source, convert))
+        return cls(model, list(dict.fromkeys(columns)), compiled, related)
+
+    def values(self, queryset):
+        """``queryset`` as the ``.values()`` rows this serializer reads."""
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def _related_ids(self, model_field, pks):
+        through = model_field.remote_field.through
+        source, target = f'{model_field.m2m_field_name()}_id', f'{model_field.m2m_reverse_field_name()}_id'
+        linked = defaultdict(list)
+        rows = through.objects.filter(**{f'{source}__in': pks}).order_by('pk').values_list(source, target)
+        for pk, related_pk in rows:
+            linked[pk].append(related_pk)
+        return linked
+
+    def to_representation(self, rows):
+        """Response dicts for ``rows``, in order."""
+        pk = self.model._meta.pk.name
+        related = {
+            name: self._related_ids(model_field, [row[pk] for row in rows])
+            for name, model_field in self.related
+        } if self.related and rows else {}
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.fields:
+                if source is None:
+                    item[name] = related[name].get(row[pk], [])
+                    continue
+                value = row[source]
+                item[name] = convert(value) if convert is not None and value is not None else value
+            data.append(item)
+        return data
+
+
+class FastListMixin:
+    """``list()`` serializing ``.values()`` rows through ``ValuesSerializer`` when enabled.
+
+    Falls back to the regular serializer when fast serialization is off or
+    the serializer cannot be compiled. Pagination classes must accept dict
+    rows, as DRF's cursor pagination does.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = ValuesSerializer.compile(self.get_serializer()) if fast_serialization_enabled() else None
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.to_representation(page))
+        return Response(compiled.to_representation(list(rows)))
@@ -0,0 +1,76 @@
+"""Sparse fieldsets: ``?fields=`` and ``?exclude=`` on serializers and querysets."""
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def requested_fields(query_params, available, always=('id',)):
+    """The subset of ``available`` field names picked by ``?fields=`` and ``?exclude=``.
+
+    Returns ``None`` when neither parameter is given. Names in ``always`` are
+    kept regardless; an unknown name is a validation error.
+    """
+    fields, exclude = _names(query_params.get('fields')), _names(query_params.get('exclude'))
+    if not fields and not exclude:
+        return None
+    unknown = [name for name in fields + exclude if name not in available]
+    if unknown:
+        raise ValidationError({'fields': [f"Unknown field: {name}." for name in unknown]})
+    selected = [name for name in available if (not fields or name in fields) and name not in exclude]
+    return [name for name in available if name in selected or name in always]
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop the fields not picked by the request's ``?fields=`` / ``?exclude=``.
+
+    Only reads are trimmed: writes validate and save every field whatever the
+    query string says. A ``sparse_fieldsets=False`` context entry keeps every
+    field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self.context.get('sparse_fieldsets', True):
+            return
+        selected = requested_fields(request.query_params, list(self.fields))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """Load only the columns behind the requested serializer fields.
+
+    Pair with a serializer using ``SparseFieldsetSerializerMixin``. Selected
+    concrete fields go through ``QuerySet.only()``; selected many-to-many
+    fields are prefetched as primary keys, one query each, instead of one
+    query per object. ``fieldset_columns`` are loaded whatever is requested,
+    for columns the view itself reads. With ``sparse_fieldsets`` set to
+    ``False`` every serializer field is loaded whatever is requested.
+    """
+    fieldset_columns = ()
+    sparse_fieldsets = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        meta = queryset.model._meta
+        fields = list(self.get_serializer_class()().fields)
+        selected = (self.sparse_fieldsets and requested_fields(self.request.query_params, fields)) or fields
+        columns = [meta.pk.name, *self.fieldset_columns]
+        related = []
+        for name in selected:
+            field = next((field for field in meta.get_fields() if field.name == name), None)
+            if field is None:
+                continue
+            if field.many_to_many and not field.auto_created:
+                related.append(Prefetch(name, queryset=field.related_model._default_manager.only('pk')))
+            elif field.concrete:
+                columns.append(name)
+        return queryset.only(*dict.fromkeys(columns)).prefetch_related(*related)
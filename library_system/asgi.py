@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from common.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
 
 application = get_asgi_application()
+
+# Map the recommendation index into memory before the first request arrives.
+from apis.recommender import warm_index  # noqa: E402
+
+warm_index()
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "apis"
 ]
 
@@ -129,11 +130,51 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Recommendation index built by `manage.py buildrecindex` and memory-mapped by each worker
+RECOMMENDATION_INDEX_DIR = BASE_DIR / 'recindex'
+# How often a worker applies queued catalog changes to its index (None disables)
+RECOMMENDATION_INDEX_REFRESH_SECONDS = 5
+# Similarity search engine: 'exact', 'ivf' or 'hnsw' (need faiss), or 'lsh' (NumPy only); built with each index
+# version, so changing it takes a buildrecindex run
+RECOMMENDATION_ENGINE = 'exact'
+# Engine tuning, e.g. {'nlist': 4096, 'nprobe': 32}, {'m': 32, 'ef_search': 64}, {'tables': 8, 'bits': 16}
+RECOMMENDATION_ENGINE_OPTIONS = {}
+# Async views (apis/async_views.py): threads for ORM calls and for vector scoring, per worker
+ASYNC_DB_THREADS = 8
+RECOMMENDATION_SCORING_THREADS = 2
+# Compute recommendations for new favorites on a thread in each web worker (apis/jobs.py);
+# set False and run `manage.py computerecommendations --loop` to compute them in one place
+RECOMMENDATION_JOBS_IN_PROCESS = True
+
+# Per-process memory cache; point at a shared backend (e.g. filebased or Redis) when running several workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library-system',
+    }
+}
+# How long serialized book/author detail payloads are cached (0 disables); saves invalidate them
+DETAIL_CACHE_SECONDS = 300
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ]
+        "common.authentication.CachedJWTAuthentication",
+    ],
+    # DRF's JSONRenderer, rendering with the optional orjson package when it is installed (common/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
+# Serialize book/author lists and recommendation cards from .values() rows (common/fast_serializers.py)
+FAST_SERIALIZATION = True
+# Users resolved from access tokens are cached for this long; saving or deleting a user drops them
+JWT_USER_CACHE_SECONDS = 300
+# ...and kept per process for this long, which bounds how stale other processes can be
+JWT_USER_LOCAL_CACHE_SECONDS = 5
+# Serve GETs on views marked token_user_reads with a stateless TokenUser, without looking the user up
+JWT_TOKEN_USER_READS = False
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": datetime.timedelta(days=365),
     "REFRESH_TOKEN_LIFETIME": datetime.timedelta(days=365),
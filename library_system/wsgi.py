@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
 
 application = get_wsgi_application()
+
+# Map the recommendation index into memory before the first request arrives.
+from apis.recommender import warm_index  # noqa: E402
+
+warm_index()